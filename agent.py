@@ -1,31 +1,148 @@
-from typing import Dict
+import json
+from typing import Dict, List, Optional, Tuple
 import yaml
 from pathlib import Path
-from .data_sources import fetch_prices, latest_close
+from .data_sources import fetch_prices, fetch_stats, stage_view, latest_close
 from .signals import generate_signals
 from .forecasting import simple_forecast
 from .portfolio import sector_report
-from .scanner import screen_universe
+from .scanner import screen_universe, factor_table, rank_factors, SCREEN_LOOKBACK
+from .pipeline import Stage, run_stages
+from .history import record
+from .price_cache import PriceCache
 from .utils import now_ams
 
-def run_day(config_path: str = "config.yaml") -> Dict:
+def run_day(config_path: str = "config.yaml", max_workers: int = 4, live=None, trace_memory: bool = False,
+            cache: Optional[PriceCache] = None) -> Dict:
     cfg = yaml.safe_load(Path(config_path).read_text(encoding="utf-8"))
     tickers = cfg["portfolio"]["tickers"]
     lookback = cfg["data"]["lookback_days"]
 
-    prices = fetch_prices(tickers, lookback_days=lookback)
-    last = latest_close(prices)
-    sigs = generate_signals(prices, cfg["signals"])
-    fc = simple_forecast(prices, horizon_days=5)
-    sector_df = sector_report(cfg["sectors"], last)
-    opps = screen_universe(cfg["sectors"])
+    universe = sorted({t for ts in cfg["sectors"].values() for t in ts})
+    needs = {"portfolio": (tickers, lookback), "screener": (universe, SCREEN_LOOKBACK)}
+    union = list(dict.fromkeys([*tickers, *universe]))
+    longest = max(lookback, SCREEN_LOOKBACK)
+
+    stages = [
+        Stage("prices", lambda: fetch_prices(union, lookback_days=longest, cache=cache), default={}),
+        Stage("portfolio", lambda prices: stage_view(prices, tickers, lookback), deps=["prices"], default={}),
+        Stage("last_prices", lambda portfolio: latest_close(portfolio), deps=["portfolio"], default={}),
+        Stage("signals", lambda portfolio: generate_signals(portfolio, cfg["signals"], live=live), deps=["portfolio"], default={}),
+        Stage("forecast_5d", lambda portfolio: simple_forecast(portfolio, horizon_days=5), deps=["portfolio"], default={}),
+        Stage("sector_report", lambda last_prices: sector_report(cfg["sectors"], last_prices).to_dict(orient="records"),
+              deps=["last_prices"], default=[]),
+        Stage("opportunities", lambda prices: screen_universe(cfg["sectors"], prices=stage_view(prices, universe, SCREEN_LOOKBACK)),
+              deps=["prices"], default={}),
+    ]
+    timestamp = now_ams()
+    if cfg.get("history"):
+        # een mislukte screener of sectorstap mag de historie van de signalen niet tegenhouden
+        stages.append(Stage("signal_changes", lambda signals, forecast_5d, opportunities, sector_report: record(
+            {"timestamp": timestamp, "signals": signals, "forecast_5d": forecast_5d, "opportunities": opportunities,
+             "sector_report": sector_report}, cfg), deps=["signals", "forecast_5d"], optional=["opportunities", "sector_report"]))
+    res, timings, errors = run_stages(stages, max_workers=max_workers, trace_memory=trace_memory)
 
     return {
-        "timestamp": now_ams(),
-        "last_prices": last,
-        "signals": sigs,
-        "forecast_5d": fc,
-        "sector_report": sector_df.to_dict(orient="records"),
-        "opportunities": opps,
+        "timestamp": timestamp,
+        "last_prices": res["last_prices"],
+        "signals": res["signals"],
+        "forecast_5d": res["forecast_5d"],
+        "sector_report": res["sector_report"],
+        "opportunities": res["opportunities"],
+        "signal_changes": res.get("signal_changes"),
         "risk": cfg["risk"],
+        "fetch_stats": fetch_stats(needs),
+        "timings": timings,
+        "errors": errors,
+    }
+
+def _plan(cfg: Dict) -> Tuple[List[str], int, List[str]]:
+    universe = sorted({t for ts in cfg["sectors"].values() for t in ts})
+    return cfg["portfolio"]["tickers"], cfg["data"]["lookback_days"], universe
+
+def run_batch(config_paths: List[str], max_workers: int = 4, trace_memory: bool = False) -> Tuple[Dict[str, Dict], Dict]:
+    paths: Dict[str, Path] = {}
+    for p in dict.fromkeys(Path(p).resolve() for p in config_paths):
+        # de naam bepaalt de uitvoermap van het rapport; twee configs met dezelfde naam zouden elkaar overschrijven
+        if p.stem in paths:
+            raise ValueError(f"Dubbele confignaam '{p.stem}': {paths[p.stem]} en {p}")
+        paths[p.stem] = p
+    cfgs = {name: yaml.safe_load(p.read_text(encoding="utf-8")) for name, p in paths.items()}
+    plans = {name: _plan(cfg) for name, cfg in cfgs.items()}
+    union = list(dict.fromkeys(t for tickers, _, universe in plans.values() for t in [*tickers, *universe]))
+    held = list(dict.fromkeys(t for tickers, _, _ in plans.values() for t in tickers))
+    screened = sorted({t for _, _, universe in plans.values() for t in universe})
+    longest = max([lb for _, lb, _ in plans.values()] + [SCREEN_LOOKBACK])
+
+    # één berekening per (ticker, lookback, signaalparameters) resp. (ticker, lookback)
+    sig_groups: Dict[Tuple[int, str], List[str]] = {}
+    fc_groups: Dict[int, List[str]] = {}
+    for name, (tickers, lookback, _) in plans.items():
+        key = (lookback, json.dumps(cfgs[name]["signals"], sort_keys=True))
+        sig_groups.setdefault(key, [])
+        sig_groups[key] += [t for t in tickers if t not in sig_groups[key]]
+        fc_groups.setdefault(lookback, [])
+        fc_groups[lookback] += [t for t in tickers if t not in fc_groups[lookback]]
+    sig_stage = {key: f"signals[{i}]" for i, key in enumerate(sig_groups)}
+    fc_stage = {lb: f"forecast_5d[{lb}]" for lb in fc_groups}
+
+    stages = [
+        Stage("prices", lambda: fetch_prices(union, lookback_days=longest), default={}),
+        Stage("last_prices", lambda prices: latest_close(stage_view(prices, held, longest)), deps=["prices"], default={}),
+        Stage("factors", lambda prices: factor_table(stage_view(prices, screened, SCREEN_LOOKBACK), screened),
+              deps=["prices"], default=None),
+    ]
+    for (lb, params), ts in sig_groups.items():
+        stages.append(Stage(sig_stage[lb, params], lambda prices, ts=ts, lb=lb, p=json.loads(params):
+                            generate_signals(stage_view(prices, ts, lb), p), deps=["prices"], default={}))
+    for lb, ts in fc_groups.items():
+        stages.append(Stage(fc_stage[lb], lambda prices, ts=ts, lb=lb: simple_forecast(stage_view(prices, ts, lb), horizon_days=5),
+                            deps=["prices"], default={}))
+    res, timings, errors = run_stages(stages, max_workers=max_workers, trace_memory=trace_memory)
+
+    reports = {}
+    timestamp = now_ams()
+    for name, cfg in cfgs.items():
+        tickers, lookback, universe = plans[name]
+        sig_name = sig_stage[lookback, json.dumps(cfg["signals"], sort_keys=True)]
+        fc_name = fc_stage[lookback]
+        sources = {"prices": "prices", "last_prices": "last_prices", "signals": sig_name,
+                   "forecast_5d": fc_name, "opportunities": "factors"}
+        errs = {stage: errors[src] for stage, src in sources.items() if src in errors}
+        last = {t: res["last_prices"][t] for t in tickers if t in res["last_prices"]}
+        try:
+            sectors = sector_report(cfg["sectors"], last).to_dict(orient="records")
+        except Exception as e:
+            sectors, errs["sector_report"] = [], f"{type(e).__name__}: {e}"
+        fac = res["factors"]
+        reports[name] = {
+            "timestamp": timestamp,
+            "last_prices": last,
+            "signals": {t: res[sig_name][t] for t in tickers if t in res[sig_name]},
+            "forecast_5d": {t: res[fc_name][t] for t in tickers if t in res[fc_name]},
+            "sector_report": sectors,
+            "opportunities": rank_factors(fac[fac.index.isin(universe)], cfg["sectors"]) if fac is not None else {},
+            "risk": cfg["risk"],
+            "fetch_stats": fetch_stats({"portfolio": (tickers, lookback), "screener": (universe, SCREEN_LOOKBACK)}),
+            "timings": timings,
+            "errors": errs,
+        }
+        if cfg.get("history"):
+            try:
+                reports[name]["signal_changes"] = record(reports[name], cfg)
+            except Exception as e:
+                errs["signal_changes"] = f"{type(e).__name__}: {e}"
+
+    requested = sum(len(set(tickers)) for tickers, _, _ in plans.values())
+    summary = {
+        "configs": len(cfgs),
+        "tickers": {"requested": sum(len(set(tickers) | set(universe)) for tickers, _, universe in plans.values()),
+                    "computed": len(union)},
+        "signals": {"requested": requested, "computed": sum(len(ts) for ts in sig_groups.values())},
+        "forecasts": {"requested": requested, "computed": sum(len(ts) for ts in fc_groups.values())},
+        "factors": {"requested": sum(len(universe) for _, _, universe in plans.values()), "computed": len(screened)},
+        "lookback_days": longest,
+        "timings": timings,
+        "errors": errors,
     }
+    return reports, summary
@@ -1,7 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import numpy as np
 import pandas as pd
-from .signals import indicators, signal_from_row
+from .panel import PricePanel
+from .signals import indicators, signal_series, signal_matrix
 
 def _metrics(returns: pd.Series) -> Dict[str, float]:
     mean = returns.mean()
@@ -16,32 +17,43 @@ def _metrics(returns: pd.Series) -> Dict[str, float]:
     hit_ratio = float((returns > 0).mean()) if len(returns) else float("nan")
     return {"cagr": cagr, "sharpe": sharpe, "max_drawdown": max_dd, "hit_ratio": hit_ratio}
 
-def backtest_ticker(df: pd.DataFrame, params: Dict[str, Any], cost_bps: int = 5) -> Dict[str, Any]:
-    ind = indicators(df, params["ma_short"], params["ma_long"], params["rsi_period"]).dropna()
-    if ind.empty:
-        return {"metrics": {}, "returns": pd.Series(dtype=float), "positions": pd.Series(dtype=float), "equity": pd.Series(dtype=float)}
-    signals = ind.apply(lambda r: signal_from_row(r, params["rsi_buy"], params["rsi_sell"]), axis=1)
-    pos = signals.replace({"BUY":1.0,"SELL":-1.0,"HOLD":0.0}).shift(1).fillna(0.0)
-    ret = df["Close"].reindex(ind.index).pct_change().fillna(0.0)
+def _backtest_codes(df: pd.DataFrame, codes: pd.Series, cost_bps: int = 5) -> Dict[str, Any]:
+    pos = codes.shift(1).fillna(0.0)
+    ret = df["Close"].reindex(codes.index).pct_change().fillna(0.0)
     strat = pos * ret
     trades = pos.diff().abs().fillna(0.0)
     tc = trades * (cost_bps/10000.0)
     strat_net = strat - tc
     return {"metrics": _metrics(strat_net), "returns": strat_net, "positions": pos, "equity": (1+strat_net).cumprod()}
 
+def backtest_ticker(df: pd.DataFrame, params: Dict[str, Any], cost_bps: int = 5, ind: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    if ind is None:
+        ind = indicators(df, params["ma_short"], params["ma_long"], params["rsi_period"]).dropna()
+    if ind.empty:
+        return {"metrics": {}, "returns": pd.Series(dtype=float), "positions": pd.Series(dtype=float), "equity": pd.Series(dtype=float)}
+    return _backtest_codes(df, signal_series(ind, params["rsi_buy"], params["rsi_sell"]), cost_bps)
+
 def backtest_portfolio(prices: Dict[str, pd.DataFrame], params: Dict[str, Any], weights: Dict[str, float] = None, cost_bps: int = 5) -> Dict[str, Any]:
     tickers = list(prices.keys())
     if not tickers:
         return {"metrics": {}, "equity": pd.Series(dtype=float), "returns": pd.Series(dtype=float)}
     if not weights:
         weights = {t: 1/len(tickers) for t in tickers}
-    rets = []
-    for t in tickers:
-        res = backtest_ticker(prices[t], params, cost_bps)
-        rets.append(res["returns"].rename(t))
-    if not rets:
+    inds = {t: indicators(prices[t], params["ma_short"], params["ma_long"], params["rsi_period"]).dropna() for t in tickers}
+    inds = {t: ind for t, ind in inds.items() if not ind.empty}
+    codes = signal_matrix(inds, params["rsi_buy"], params["rsi_sell"])
+    if codes.empty:
         return {"metrics": {}, "equity": pd.Series(dtype=float), "returns": pd.Series(dtype=float)}
-    df = pd.concat(rets, axis=1).fillna(0.0)
+    # slotkoersen uit één panel op de signaaldatums; per ticker telt alleen de eigen signaaldag (on),
+    # zoals in _backtest_codes: positie en rendement t.o.v. de vorige eigen signaaldag
+    panel = PricePanel.from_dict({t: prices[t] for t in codes.columns}, fields=("Close",))
+    rows = panel.dates.get_indexer(codes.index)
+    close = pd.DataFrame(panel.field("Close")[rows], index=codes.index, columns=panel.tickers)
+    on = codes.notna() & pd.DataFrame(panel.valid.T[rows], index=codes.index, columns=panel.tickers)
+    pos = codes.ffill().shift(1).where(on).fillna(0.0)
+    ret = (close / close.where(on).ffill().shift(1) - 1).where(on).fillna(0.0)
+    trades = (pos - pos.where(on).ffill().shift(1)).abs().where(on).fillna(0.0)
+    df = (pos * ret - trades * (cost_bps/10000.0)).reindex(columns=tickers, fill_value=0.0)
     w = pd.Series(weights).reindex(df.columns).fillna(0.0)
     port_ret = (df * w).sum(axis=1)
     equity = (1 + port_ret).cumprod()
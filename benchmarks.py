@@ -0,0 +1,127 @@
+import argparse, json, platform, subprocess, sys, time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+import pandas as pd
+from .backtest import backtest_ticker, backtest_portfolio
+from .forecasting import simple_forecast
+from .report import make_report_md
+from .scanner import screen_universe
+from .signals import indicators, generate_signals
+from .simulation import simulate_portfolio
+from .synthetic import synthetic_universe, synthetic_sectors
+
+PARAMS = {"ma_short": 20, "ma_long": 50, "rsi_period": 14, "rsi_buy": 35, "rsi_sell": 65}
+RISK = {"max_position_pct": 0.2, "stop_loss_pct": 0.1, "take_profit_pct": 0.2}
+
+def _report_input(prices: Dict[str, pd.DataFrame]) -> dict:
+    sectors = synthetic_sectors(list(prices))
+    return {"timestamp": "benchmark", "signals": generate_signals(prices, PARAMS),
+            "forecast_5d": simple_forecast(prices), "opportunities": screen_universe(sectors, prices=prices),
+            "sector_report": [{"sector": s, "tickers": ", ".join(ts), "avg_price": 1.0, "count": len(ts)} for s, ts in sectors.items()]}
+
+def cases(prices: Dict[str, pd.DataFrame]) -> Dict[str, Callable[[], object]]:
+    sectors = synthetic_sectors(list(prices))
+    rep = {}
+
+    def report():
+        if "r" not in rep:
+            rep["r"] = _report_input(prices)
+        return make_report_md(rep["r"])
+
+    return {
+        "indicators": lambda: [indicators(df, PARAMS["ma_short"], PARAMS["ma_long"], PARAMS["rsi_period"]) for df in prices.values()],
+        "generate_signals": lambda: generate_signals(prices, PARAMS),
+        "backtest_ticker": lambda: [backtest_ticker(df, PARAMS) for df in prices.values()],
+        "backtest_portfolio": lambda: backtest_portfolio(prices, PARAMS),
+        "simulate_portfolio": lambda: simulate_portfolio(prices, PARAMS, risk=RISK),
+        "simple_forecast": lambda: simple_forecast(prices),
+        "screen_universe": lambda: screen_universe(sectors, prices=prices),
+        "make_report_md": report,
+    }
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t)
+    return runs
+
+def run(ticker_sizes: List[int], year_sizes: List[float], base_years: float = 1.0, base_tickers: int = 100,
+        functions: List[str] = None, repeat: int = 3, seed: int = 0, log=print) -> dict:
+    grid = [(n, base_years) for n in ticker_sizes] + [(base_tickers, y) for y in year_sizes]
+    grid = list(dict.fromkeys(grid))
+    end = pd.Timestamp("2025-12-31")
+    results = []
+    for n, years in grid:
+        prices = synthetic_universe(n, years, seed, end)
+        for name, fn in cases(prices).items():
+            if functions and name not in functions:
+                continue
+            if name == "make_report_md":
+                fn()
+            runs = _time(fn, repeat)
+            results.append({"name": name, "tickers": n, "years": years, "seconds": min(runs), "runs": runs})
+            log(f"{name:<20} {n:>5} tickers {years:>4g} jaar  {min(runs)*1000:10.1f} ms")
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent).stdout.strip()
+    except OSError:
+        rev = ""
+    meta = {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "platform": platform.platform(), "pandas": pd.__version__, "git": rev, "seed": seed, "repeat": repeat}
+    return {"meta": meta, "results": results}
+
+def compare(old: dict, new: dict, threshold: float = 0.15, min_seconds: float = 0.005) -> List[dict]:
+    base = {(r["name"], r["tickers"], r["years"]): r["seconds"] for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        key = (r["name"], r["tickers"], r["years"])
+        if key not in base:
+            continue
+        ratio = r["seconds"] / base[key] if base[key] else float("inf")
+        noisy = max(r["seconds"], base[key]) < min_seconds
+        rows.append({"name": key[0], "tickers": key[1], "years": key[2], "old": base[key], "new": r["seconds"],
+                     "ratio": ratio, "regression": (not noisy) and ratio > 1 + threshold})
+    return rows
+
+def _floats(s: str) -> List[float]:
+    return [float(x) for x in s.split(",") if x.strip()]
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmarks op synthetische marktdata")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Draai de benchmarks en schrijf JSON")
+    r.add_argument("--tickers", default="10,100,1000,5000")
+    r.add_argument("--years", default="1,5,20")
+    r.add_argument("--base-years", type=float, default=1.0, help="Historie bij de ticker-reeks")
+    r.add_argument("--base-tickers", type=int, default=100, help="Aantal tickers bij de jaren-reeks")
+    r.add_argument("--functions", default=None, help="Komma-gescheiden subset, bijv. backtest_portfolio,screen_universe")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--output", default="data/bench.json")
+    c = sub.add_parser("compare", help="Vergelijk twee benchmark-JSONs en markeer regressies")
+    c.add_argument("old")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.15, help="Toegestane vertraging (0.15 = 15%%)")
+    c.add_argument("--min-seconds", type=float, default=0.005, help="Metingen onder deze tijd negeren (ruis)")
+    args = p.parse_args(argv)
+
+    if args.cmd == "run":
+        res = run([int(x) for x in _floats(args.tickers)], _floats(args.years), args.base_years, args.base_tickers,
+                  args.functions.split(",") if args.functions else None, args.repeat, args.seed)
+        out = Path(args.output); out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"Resultaten opgeslagen: {out}")
+    else:
+        rows = compare(json.loads(Path(args.old).read_text(encoding="utf-8")),
+                       json.loads(Path(args.new).read_text(encoding="utf-8")), args.threshold, args.min_seconds)
+        for row in rows:
+            flag = "REGRESSIE" if row["regression"] else ""
+            print(f"{row['name']:<20} {row['tickers']:>5} {row['years']:>4g}j  {row['old']*1000:9.1f} -> {row['new']*1000:9.1f} ms  x{row['ratio']:.2f} {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
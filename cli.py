@@ -1,15 +1,27 @@
-import argparse, json, sys
+import time
+_T_START = time.perf_counter()
+import argparse, importlib, json, os, subprocess, sys
 from pathlib import Path
+from .params import PARAM_KEYS
+from .timing import Timings
 
-THIS_DIR = Path(__file__).resolve().parent
-if str(THIS_DIR) not in sys.path:
-    sys.path.insert(0, str(THIS_DIR))
+# zware modules per subcommand; alleen deze worden bij dat commando geladen (en door bench-startup gemeten)
+COMMAND_DEPS = {
+    "backtest-portfolio": ("data_sources", "backtest"),
+    "optimize": ("data_sources", "optimize"),
+    "forecast-eval": ("data_sources", "forecasting"),
+    "send-report": ("agent", "report"),
+    "serve": ("service",),
+}
 
-import yaml
-from data_sources import fetch_prices
-from backtest import backtest_portfolio
-from agent import run_day
-from report import make_report_md, send_slack, send_email
+def _min_window(s: str) -> int:
+    if int(s) < 2:
+        raise argparse.ArgumentTypeError("minstens 2")
+    return int(s)
+
+def load_config(path: str) -> dict:
+    import yaml
+    return yaml.safe_load(Path(path).read_text(encoding="utf-8"))
 
 def parse_weights(s: str, tickers: list) -> dict:
     if not s:
@@ -26,48 +38,277 @@ def parse_weights(s: str, tickers: list) -> dict:
         w.setdefault(t, 0.0)
     return w
 
-def cmd_backtest_portfolio(args):
-    cfg = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
+def _backtest_local(args):
+    tm = args.timer
+    with tm.phase("import"):
+        from .data_sources import fetch_prices
+        from .backtest import backtest_portfolio
+    cfg = load_config(args.config)
     tickers = cfg["portfolio"]["tickers"]
-    prices = fetch_prices(tickers, lookback_days=cfg["data"]["lookback_days"])
+    with tm.phase("prijzen"):
+        prices = fetch_prices(tickers, lookback_days=cfg["data"]["lookback_days"])
     weights = parse_weights(args.weights, tickers)
-    res = backtest_portfolio(prices, cfg["signals"], weights=weights, cost_bps=args.cost_bps)
+    with tm.phase("backtest"):
+        if args.simulate:
+            from .simulation import simulate_portfolio
+            return simulate_portfolio(prices, cfg["signals"], weights=weights, risk=cfg.get("risk"),
+                                      rebalance=args.rebalance, cost_bps=args.cost_bps)
+        return backtest_portfolio(prices, cfg["signals"], weights=weights, cost_bps=args.cost_bps)
+
+def _backtest_via_service(args):
+    from .client import ServiceClient, equity_series
+    weights = parse_weights(args.weights, []) if args.weights else None
+    with args.timer.phase("service"):
+        res = ServiceClient(args.service).backtest_portfolio(weights, args.cost_bps)
+    return {"metrics": res["metrics"], "equity": equity_series(res["equity"]), "returns": equity_series(res["returns"])}
+
+def cmd_backtest_portfolio(args):
+    tm = args.timer
+    if args.service and not args.simulate:
+        res = _backtest_via_service(args)
+    else:
+        res = _backtest_local(args)
     out_dir = Path(args.output); out_dir.mkdir(parents=True, exist_ok=True)
     (out_dir / "portfolio_metrics.json").write_text(json.dumps(res["metrics"], indent=2), encoding="utf-8")
     res["equity"].to_csv(out_dir / "portfolio_equity.csv")
+    if "weights" in res:
+        res["weights"].to_csv(out_dir / "portfolio_weights.csv")
     print(json.dumps(res["metrics"], indent=2))
+    if args.bootstrap:
+        with tm.phase("bootstrap"):
+            from .bootstrap import bootstrap_intervals
+            ci = bootstrap_intervals(res["returns"], n_paths=args.bootstrap, block=args.block, seed=args.seed,
+                                     max_mb=args.max_mb)
+        ci.to_csv(out_dir / "portfolio_bootstrap.csv")
+        print(ci.round(4).to_string())
+
+def cmd_optimize(args):
+    tm = args.timer
+    with tm.phase("import"):
+        from .data_sources import fetch_prices
+        from .optimize import optimize, parse_grid_values, save_results
+    cfg = load_config(args.config)
+    tickers = cfg["portfolio"]["tickers"]
+    with tm.phase("prijzen"):
+        prices = fetch_prices(tickers, lookback_days=cfg["data"]["lookback_days"])
+    defaults = {**cfg["signals"], "cost_bps": 5}
+    grid = {k: parse_grid_values(getattr(args, k) or str(defaults[k])) for k in PARAM_KEYS}
+    with tm.phase("sweep"):
+        res = optimize(prices, grid, weights=parse_weights(args.weights, list(prices.keys())),
+                       workers=args.workers, checkpoint=args.checkpoint, sort_by=args.sort_by)
+    save_results(res, args.output)
+    print(f"{len(res)} combinaties opgeslagen: {args.output}")
+    print(res.head(args.top).to_string(index=False))
+
+def cmd_forecast_eval(args):
+    tm = args.timer
+    with tm.phase("import"):
+        from .data_sources import fetch_prices
+        from .forecasting import walk_forward
+    cfg = load_config(args.config)
+    tickers = cfg["portfolio"]["tickers"]
+    with tm.phase("prijzen"):
+        prices = fetch_prices(tickers, lookback_days=cfg["data"]["lookback_days"])
+    with tm.phase("walk-forward"):
+        res = walk_forward(prices, horizon_days=args.horizon, window=args.window)
+    out_dir = Path(args.output); out_dir.mkdir(parents=True, exist_ok=True)
+    res["forecasts"].to_csv(out_dir / "forecast_walkforward.csv", index=False)
+    res["stats"].to_csv(out_dir / "forecast_accuracy.csv")
+    print(res["stats"].round(4).to_string())
+
+def _deliver(args, outgoing):
+    if not (args.to_slack or args.to_email):
+        return
+    from .delivery import Dispatcher, Ledger, Message, SlackSender, SmtpSender
+    from .memo import make_key
+    slack = args.to_slack and (os.getenv("SLACK_WEBHOOK_URL") if args.to_slack == "ENV" else args.to_slack)
+    email = args.to_email and (os.getenv("EMAIL_TO") if args.to_email == "ENV" else args.to_email)
+    # een ontbrekende env var moet zichtbaar zijn (cron), niet stil overgeslagen worden
+    if args.to_slack and not slack:
+        print("Slack: FOUT: SLACK_WEBHOOK_URL ontbreekt")
+    if args.to_email and not email:
+        print("E-mail: FOUT: EMAIL_TO ontbreekt")
+    senders = {}
+    if slack:
+        senders["slack"] = SlackSender()
+    smtp = SmtpSender.from_env() if email else None
+    if smtp:
+        senders["email"] = smtp
+    outbox = []
+    for name, subject, md, day in outgoing:
+        if slack:
+            outbox.append((name, Message("slack", slack, md, key=make_key("rapport", name, day, "slack", slack))))
+        for to in (t.strip() for t in (email or "").split(",") if t.strip()):
+            outbox.append((name, Message("email", to, md, subject, key=make_key("rapport", name, day, "email", to))))
+    ledger = None if args.resend or args.ledger.lower() == "off" else Ledger(args.ledger)
+    with Dispatcher(senders, ledger) as d:
+        for (name, m), r in zip(outbox, d.deliver([m for _, m in outbox])):
+            label = "Slack" if m.channel == "slack" else f"E-mail {m.target}"
+            status = {"sent": "OK" if r["parts"] < 2 else f"OK ({r['parts']} delen)",
+                      "duplicate": "al verzonden, overgeslagen"}.get(r["status"], f"FOUT: {r['error']}")
+            print(f"{label}{f' ({name})' if name else ''}: {status}")
+
+def _stage_phases(timings: dict) -> list:
+    # peak_mem_mb is alleen gevuld als run_stages met trace_memory draaide (--timings)
+    return [(f"  {name}" + (f" ({t['peak_mem_mb']:.1f} MB)" if t.get("peak_mem_mb", 0) > 0 else ""), t["wall_s"])
+            for name, t in timings.items() if name != "total"]
 
 def cmd_send_report(args):
-    rep = run_day(args.config)
+    if args.configs:
+        return cmd_send_batch(args)
+    tm = args.timer
+    with tm.phase("import"):
+        from .report import make_report_md
+        if not args.service:
+            from .agent import run_day
+    if args.service:
+        from .client import ServiceClient
+        with tm.phase("service"):
+            rep = ServiceClient(args.service).report()
+    else:
+        with tm.phase("run_day"):
+            rep = run_day(args.config, trace_memory=args.timings)
+    tm.phases.extend(_stage_phases(rep.get("timings", {})))
     md = make_report_md(rep)
     out_dir = Path(args.output); out_dir.mkdir(parents=True, exist_ok=True)
     (out_dir / "daily_report.md").write_text(md, encoding="utf-8")
     print(f"Rapport opgeslagen: {out_dir/'daily_report.md'}")
-    if args.to_slack:
-        ok, msg = send_slack(md, webhook_url=None if args.to_slack == "ENV" else args.to_slack); print("Slack:", "OK" if ok else f"FOUT: {msg}")
-    if args.to_email:
-        ok, msg = send_email("Dagrapport Beleggings Agent", md, to_addr=None if args.to_email == "ENV" else args.to_email); print("E-mail:", "OK" if ok else f"FOUT: {msg}")
+    with tm.phase("verzenden"):
+        _deliver(args, [("", "Dagrapport Beleggings Agent", md, rep["timestamp"][:10])])
+
+def cmd_send_batch(args):
+    tm = args.timer
+    with tm.phase("import"):
+        from .agent import run_batch
+        from .report import make_report_md
+    paths = sorted(p for p in Path(args.configs).iterdir() if p.suffix in (".yaml", ".yml"))
+    if not paths:
+        raise SystemExit(f"Geen configs gevonden in {args.configs}")
+    with tm.phase("run_batch"):
+        try:
+            reports, summary = run_batch([str(p) for p in paths], trace_memory=args.timings)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    tm.phases.extend(_stage_phases(summary["timings"]))
+    out_dir = Path(args.output); out_dir.mkdir(parents=True, exist_ok=True)
+    outgoing = []
+    for name, rep in reports.items():
+        md = make_report_md(rep)
+        (out_dir / name).mkdir(exist_ok=True)
+        (out_dir / name / "daily_report.md").write_text(md, encoding="utf-8")
+        print(f"Rapport opgeslagen: {out_dir / name / 'daily_report.md'}")
+        outgoing.append((name, f"Dagrapport Beleggings Agent • {name}", md, rep["timestamp"][:10]))
+    with tm.phase("verzenden"):
+        _deliver(args, outgoing)
+    (out_dir / "batch_summary.json").write_text(json.dumps({k: v for k, v in summary.items() if k != "timings"}, indent=2), encoding="utf-8")
+    print(f"{summary['configs']} configs, lookback {summary['lookback_days']} dagen")
+    for part in ("tickers", "signals", "forecasts", "factors"):
+        n = summary[part]
+        print(f"  {part:<10} {n['computed']:>5} berekend i.p.v. {n['requested']:>5} ({n['requested'] - n['computed']} bespaard)")
+
+def cmd_serve(args):
+    with args.timer.phase("import"):
+        from .service import serve
+    serve(args.config, args.host, args.port, args.refresh_minutes)
+
+def _import_deps(cmd: str):
+    for mod in COMMAND_DEPS.get(cmd, ()):
+        importlib.import_module(f"{__package__}.{mod}")
+
+def cmd_bench_startup(args):
+    budgets = {c: args.budget_ms for c in COMMAND_DEPS}
+    for item in args.budget or []:
+        c, ms = item.split("=")
+        budgets[c.strip()] = float(ms)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p or os.getcwd() for p in sys.path)}
+    code = ("import time; t = time.perf_counter(); import {pkg}.cli as c; c._import_deps({cmd!r}); "
+            "print(time.perf_counter() - t)")
+    failed = []
+    for cmd in (args.commands or list(COMMAND_DEPS)):
+        runs = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", code.format(pkg=__package__, cmd=cmd)], env=env,
+                                 capture_output=True, text=True, check=True)
+            runs.append(((time.perf_counter() - t) * 1000, float(out.stdout.strip()) * 1000))
+        wall, imp = min(runs)
+        ok = wall <= budgets[cmd]
+        print(f"{cmd:<20} start {wall:7.0f} ms  (imports {imp:6.0f} ms)  budget {budgets[cmd]:6.0f} ms  {'OK' if ok else 'TE TRAAG'}")
+        if not ok:
+            failed.append(cmd)
+    if failed:
+        sys.exit(1)
 
 def main():
     p = argparse.ArgumentParser(description="Beleggings AI Agent CLI")
+    p.add_argument("--timings", action="store_true", help="Toon importtijd en tijd per fase")
+    p.add_argument("--service", default=os.getenv("AGENT_SERVICE_URL"), help="URL van een draaiende agent-service (standaard: $AGENT_SERVICE_URL)")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     b = sub.add_parser("backtest-portfolio", help="Backtest over portfolio (gewogen)")
     b.add_argument("--config", default="config.yaml")
     b.add_argument("--weights", help="Bijv: ASML.AS=0.25,AAPL=0.25,MSFT=0.25,NVDA=0.25")
     b.add_argument("--cost-bps", type=int, default=5)
+    b.add_argument("--simulate", action="store_true", help="Portefeuillesimulatie met de risk-regels uit de config (positielimiet, stop-loss, take-profit)")
+    b.add_argument("--rebalance", default="M", choices=["D", "W", "M", "Q", "Y", "none"], help="Rebalance-frequentie bij --simulate")
+    b.add_argument("--bootstrap", type=int, default=0, help="Aantal bootstrap-paden voor percentielintervallen (0 = uit)")
+    b.add_argument("--block", type=float, default=20, help="Gemiddelde bloklengte in dagen (stationaire bootstrap)")
+    b.add_argument("--seed", type=int, default=None)
+    b.add_argument("--max-mb", type=float, default=256, help="Geheugenlimiet per chunk van paden")
     b.add_argument("--output", default="data")
     b.set_defaults(func=cmd_backtest_portfolio)
 
+    o = sub.add_parser("optimize", help="Parameter-sweep over signaalparameters (gerangschikte tabel)")
+    o.add_argument("--config", default="config.yaml")
+    for k in PARAM_KEYS:
+        o.add_argument(f"--{k.replace('_', '-')}", dest=k, help="Lijst of bereik, bijv. 10,20,30 of 10:50:5 (standaard: waarde uit config)")
+    o.add_argument("--weights", help="Bijv: ASML.AS=0.25,AAPL=0.25,MSFT=0.25,NVDA=0.25")
+    o.add_argument("--workers", type=int, default=None, help="Aantal processen (standaard: aantal CPU's)")
+    o.add_argument("--checkpoint", default=None, help="CSV-bestand om een onderbroken sweep te hervatten")
+    o.add_argument("--sort-by", default="sharpe", choices=["cagr", "sharpe", "max_drawdown", "hit_ratio"])
+    o.add_argument("--top", type=int, default=10)
+    o.add_argument("--output", default="data/optimize.csv", help=".csv of .parquet")
+    o.set_defaults(func=cmd_optimize)
+
+    f = sub.add_parser("forecast-eval", help="Walk-forward evaluatie van de trend-forecast")
+    f.add_argument("--config", default="config.yaml")
+    f.add_argument("--horizon", type=int, default=5)
+    f.add_argument("--window", type=_min_window, default=None, help="Rollend trainingsvenster in dagen, minstens 2 (standaard: expanding)")
+    f.add_argument("--output", default="data")
+    f.set_defaults(func=cmd_forecast_eval)
+
     r = sub.add_parser("send-report", help="Genereer dagrapport en verzend via Slack/e-mail")
     r.add_argument("--config", default="config.yaml")
+    r.add_argument("--configs", default=None, help="Map met config-bestanden: één gedeelde run, rapport per config")
     r.add_argument("--output", default="data")
     r.add_argument("--to-slack", default=None, help="Slack webhook URL of 'ENV'")
-    r.add_argument("--to-email", default=None, help="E-mailadres of 'ENV'")
+    r.add_argument("--to-email", default=None, help="E-mailadres(sen, komma-gescheiden) of 'ENV'")
+    r.add_argument("--ledger", default="data/delivery_ledger.json", help="Idempotentie-logboek ('off' = uit)")
+    r.add_argument("--resend", action="store_true", help="Negeer het logboek en verstuur opnieuw")
     r.set_defaults(func=cmd_send_report)
 
+    v = sub.add_parser("serve", help="Start de agent als service met HTTP/JSON-API en periodieke refresh")
+    v.add_argument("--config", default="config.yaml")
+    v.add_argument("--host", default="127.0.0.1")
+    v.add_argument("--port", type=int, default=8765)
+    v.add_argument("--refresh-minutes", type=float, default=15.0)
+    v.set_defaults(func=cmd_serve)
+
+    s = sub.add_parser("bench-startup", help="Meet koude start per subcommand en faal boven het budget")
+    s.add_argument("commands", nargs="*", help="Subcommands (standaard: alle)")
+    s.add_argument("--budget-ms", type=float, default=2500.0)
+    s.add_argument("--budget", action="append", help="Per commando, bijv. backtest-portfolio=1500")
+    s.add_argument("--repeat", type=int, default=3)
+    s.set_defaults(func=cmd_bench_startup)
+
     args = p.parse_args()
-    args.func(args)
+    args.timer = Timings()
+    args.timer.phases.append(("cli-start", args.timer.t0 - _T_START))
+    try:
+        args.func(args)
+    finally:
+        if args.timings:
+            print(args.timer.report(), file=sys.stderr)
 
 if __name__ == "__main__":
     main()
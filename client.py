@@ -0,0 +1,58 @@
+import json, os
+from typing import Any, Dict, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+def service_url() -> Optional[str]:
+    return os.getenv("AGENT_SERVICE_URL") or None
+
+def equity_series(payload: Dict[str, float]):
+    import pandas as pd
+    return pd.Series({pd.Timestamp(k): v for k, v in payload.items()}, dtype=float)
+
+class ServiceClient:
+    def __init__(self, url: str, timeout: float = 300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path: str, method: str = "GET", raw: bool = False, **params) -> Any:
+        query = urlencode({k: v for k, v in params.items() if v is not None})
+        req = Request(f"{self.url}{path}{'?' + query if query else ''}", method=method)
+        try:
+            with urlopen(req, timeout=self.timeout) as res:
+                body = res.read().decode("utf-8")
+        except HTTPError as e:
+            try:
+                msg = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+            except ValueError:
+                msg = e.reason
+            raise RuntimeError(f"Service {e.code}: {msg}") from None
+        except URLError as e:
+            raise RuntimeError(f"Service niet bereikbaar op {self.url}: {e.reason}") from None
+        return body if raw else json.loads(body)
+
+    def health(self) -> Dict:
+        return self._call("/health")
+
+    def report(self) -> Dict:
+        return self._call("/report")
+
+    def report_md(self) -> str:
+        return self._call("/report", raw=True, format="md")
+
+    def signals(self, ticker: Optional[str] = None) -> Dict:
+        return self._call(f"/signals/{ticker}" if ticker else "/signals")
+
+    def forecast(self, ticker: Optional[str] = None) -> Dict:
+        return self._call(f"/forecast/{ticker}" if ticker else "/forecast")
+
+    def backtest(self, ticker: str, params: Optional[Dict] = None, cost_bps: float = 5) -> Dict:
+        return self._call("/backtest", ticker=ticker, cost_bps=cost_bps, **(params or {}))
+
+    def backtest_portfolio(self, weights: Optional[Dict[str, float]] = None, cost_bps: float = 5) -> Dict:
+        w = ",".join(f"{t}={v}" for t, v in weights.items()) if weights else None
+        return self._call("/backtest/portfolio", weights=w, cost_bps=cost_bps)
+
+    def refresh(self) -> Dict:
+        return self._call("/refresh", method="POST")
@@ -1,20 +1,20 @@
-from typing import List, Dict
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
+from .price_cache import PriceCache, get_default_cache, lookback_start
 
-def fetch_prices(tickers: List[str], lookback_days: int = 365) -> Dict[str, pd.DataFrame]:
-    start = datetime.today() - timedelta(days=lookback_days*2)
-    data = {}
-    for t in tickers:
-        try:
-            df = yf.download(t, start=start.strftime("%Y-%m-%d"), progress=False, auto_adjust=True)
-            if not df.empty:
-                df = df.rename(columns=str.title)
-                data[t] = df.dropna()
-        except Exception as e:
-            print(f"[WARN] Kon data niet ophalen voor {t}: {e}")
-    return data
+def fetch_prices(tickers: List[str], lookback_days: int = 365, cache: Optional[PriceCache] = None) -> Dict[str, pd.DataFrame]:
+    cache = cache or get_default_cache()
+    return cache.get(tickers, lookback_start(lookback_days))
+
+def fetch_stats(needs: Dict[str, Tuple[List[str], int]]) -> Dict[str, int]:
+    union = {t for ts, _ in needs.values() for t in ts}
+    requested = sum(len(set(ts)) for ts, _ in needs.values())
+    return {"requested": requested, "fetched": len(union), "avoided": requested - len(union)}
+
+def stage_view(panel: Mapping[str, pd.DataFrame], tickers: List[str], lookback_days: int) -> Mapping[str, pd.DataFrame]:
+    start = lookback_start(lookback_days)
+    return MappingProxyType({t: panel[t].loc[start:] for t in tickers if t in panel})
 
 def latest_close(prices: Dict[str, pd.DataFrame]) -> Dict[str, float]:
     return {t: float(df["Close"].iloc[-1]) for t, df in prices.items() if not df.empty}
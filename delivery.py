@@ -0,0 +1,278 @@
+import json, logging, os, random, re, smtplib, ssl, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.mime.text import MIMEText
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from .memo import make_key
+
+log = logging.getLogger(__name__)
+
+SLACK_LIMIT = 3800
+MAX_RETRY_AFTER = 60.0
+_SEPARATOR = re.compile(r"^\|(\s*:?-+:?\s*\|)+\s*$")
+
+def chunk_markdown(md: str, limit: int = SLACK_LIMIT) -> List[str]:
+    if len(md) <= limit:
+        return [md]
+    room = limit - 20  # ruimte voor "_(deel i/n)_"
+    lines = md.split("\n")
+    chunks, cur, size = [], [], 0
+    header: List[str] = []
+    header_at = -1
+    for i, line in enumerate(lines):
+        if not line.startswith("|"):
+            header, header_at = [], -1
+        elif i + 1 < len(lines) and _SEPARATOR.match(lines[i + 1]):
+            header, header_at = [line, lines[i + 1]], i
+        while len(line) > room:
+            if cur:
+                chunks.append("\n".join(cur)); cur, size = [], 0
+            chunks.append(line[:room]); line = line[room:]
+        if cur and size + len(line) + 1 > room:
+            chunks.append("\n".join(cur))
+            # tabel loopt door: kop herhalen, tenzij deze regel zelf bij de kop hoort
+            cur = list(header) if header and i > header_at + 1 else []
+            size = sum(len(x) + 1 for x in cur)
+        cur.append(line)
+        size += len(line) + 1
+    if cur:
+        chunks.append("\n".join(cur))
+    n = len(chunks)
+    return [f"{c}\n_(deel {i}/{n})_" for i, c in enumerate(chunks, 1)] if n > 1 else chunks
+
+def retry_after_seconds(value: Optional[str], cap: float = MAX_RETRY_AFTER) -> Optional[float]:
+    # Retry-After is een aantal seconden of een HTTP-datum (RFC 9110); nooit langer wachten dan cap
+    if not value:
+        return None
+    try:
+        secs = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        secs = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(secs, 0.0), cap)
+
+class DeliveryError(Exception):
+    def __init__(self, msg: str, retry: bool = True, retry_after: Optional[float] = None):
+        super().__init__(msg)
+        self.retry = retry
+        self.retry_after = retry_after
+
+class Message:
+    def __init__(self, channel: str, target: str, body: str, subject: str = "", key: Optional[str] = None):
+        self.channel = channel
+        self.target = target
+        self.body = body
+        self.subject = subject
+        self.key = key or make_key(channel, target, subject, body)
+
+class Ledger:
+    def __init__(self, path: Optional[str] = "data/delivery_ledger.json", keep_days: int = 30):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._sent: Dict[str, str] = {}
+        if self.path:
+            try:
+                self._sent = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._sent = {}
+        cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+        self._sent = {k: ts for k, ts in self._sent.items() if ts >= cutoff}
+
+    def sent(self, key: str) -> bool:
+        with self._lock:
+            return key in self._sent
+
+    def mark(self, key: str):
+        with self._lock:
+            self._sent[key] = datetime.now().isoformat(timespec="seconds")
+            if not self.path:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(self._sent, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+class SlackSender:
+    channel = "slack"
+
+    def __init__(self, timeout: float = 10, pool_size: int = 8, limit: int = SLACK_LIMIT,
+                 max_retry_after: float = MAX_RETRY_AFTER):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timeout = timeout
+        self.limit = limit
+        self.max_retry_after = max_retry_after
+
+    def parts(self, msg: Message) -> List[str]:
+        return chunk_markdown(msg.body, self.limit)
+
+    def send(self, target: str, text: str, subject: str = ""):
+        try:
+            res = self.session.post(target, json={"text": text}, timeout=self.timeout)
+        except Exception as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}")
+        if res.status_code == 429 or res.status_code >= 500:
+            raise DeliveryError(f"HTTP {res.status_code}: {res.text[:200]}",
+                                retry_after=retry_after_seconds(res.headers.get("Retry-After"), self.max_retry_after))
+        if not 200 <= res.status_code < 300:
+            raise DeliveryError(f"HTTP {res.status_code}: {res.text[:200]}", retry=False)
+
+    def close(self):
+        self.session.close()
+
+class SmtpSender:
+    channel = "email"
+
+    def __init__(self, host: str, port: int = 587, user: Optional[str] = None, password: Optional[str] = None,
+                 sender: Optional[str] = None, starttls: bool = True, timeout: float = 30):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.sender = sender or user
+        self.starttls = starttls
+        self.timeout = timeout
+        self._conn: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["SmtpSender"]:
+        if not os.getenv("SMTP_HOST"):
+            return None
+        return cls(os.getenv("SMTP_HOST"), int(os.getenv("SMTP_PORT", "587")), os.getenv("SMTP_USER"),
+                   os.getenv("SMTP_PASS"), os.getenv("SMTP_FROM"), os.getenv("SMTP_STARTTLS", "1") != "0")
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls(context=ssl.create_default_context())
+        if self.user and self.password:
+            conn.login(self.user, self.password)
+        return conn
+
+    def parts(self, msg: Message) -> List[str]:
+        return [msg.body]
+
+    def send(self, target: str, text: str, subject: str = ""):
+        mime = MIMEText(text, "plain", "utf-8")
+        mime["Subject"] = subject; mime["From"] = self.sender or ""; mime["To"] = target
+        # één verbinding voor alle ontvangers; smtplib is niet thread-safe
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = self._connect()
+                self._conn.sendmail(self.sender or "", [target], mime.as_string())
+            except smtplib.SMTPRecipientsRefused as e:
+                raise DeliveryError(f"ontvanger geweigerd: {e.recipients}", retry=False)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    raise DeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}", retry=False)
+                self._drop()
+                raise DeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}")
+            except (smtplib.SMTPException, OSError) as e:
+                self._drop()
+                raise DeliveryError(f"{type(e).__name__}: {e}")
+
+    def _drop(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.quit()
+                except Exception:
+                    pass
+            self._drop()
+
+class Dispatcher:
+    def __init__(self, senders: Dict[str, object], ledger: Optional[Ledger] = None, retries: int = 3,
+                 backoff: float = 0.5, max_workers: int = 4):
+        self.senders = senders
+        self.ledger = ledger
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for s in self.senders.values():
+            s.close()
+
+    def _send(self, sender, msg: Message, text: str) -> int:
+        for attempt in range(1, self.retries + 2):
+            try:
+                sender.send(msg.target, text, msg.subject)
+                return attempt
+            except DeliveryError as e:
+                if not e.retry or attempt > self.retries:
+                    e.attempts = attempt
+                    raise
+                time.sleep(max(e.retry_after or 0, self.backoff * 2 ** (attempt - 1) * (1 + 0.25 * random.random())))
+
+    def _deliver_one(self, msg: Message) -> Dict:
+        res = {"channel": msg.channel, "target": msg.target, "key": msg.key, "status": "sent", "parts": 0,
+               "attempts": 0, "error": None}
+        sender = self.senders.get(msg.channel)
+        if sender is None:
+            return {**res, "status": "failed", "error": f"kanaal {msg.channel} niet geconfigureerd"}
+        parts = sender.parts(msg)
+        res["parts"] = len(parts)
+        skipped = 0
+        # delen in volgorde; bij een herstart gaat het verder bij het eerste niet-verzonden deel. De sleutel is
+        # bericht + deel i/n (niet de tekst: de kop bevat de tijd van de run); anders opgeknipt = opnieuw versturen
+        for i, text in enumerate(parts):
+            key = f"{msg.key}:{i + 1}/{len(parts)}"
+            if self.ledger and self.ledger.sent(key):
+                skipped += 1
+                continue
+            try:
+                res["attempts"] += self._send(sender, msg, text)
+            except DeliveryError as e:
+                res["attempts"] += getattr(e, "attempts", 1)
+                return {**res, "status": "failed", "error": f"deel {i + 1}/{len(parts)}: {e}" if len(parts) > 1 else str(e)}
+            if self.ledger:
+                self.ledger.mark(key)
+        if skipped == len(parts):
+            res["status"] = "duplicate"
+        return res
+
+    def _deliver_group(self, msgs: List[Message]) -> List[Dict]:
+        return [self._deliver_one(m) for m in msgs]
+
+    def deliver(self, messages: List[Message]) -> List[Dict]:
+        groups: Dict[tuple, List[int]] = {}
+        for i, m in enumerate(messages):
+            groups.setdefault((m.channel, m.target), []).append(i)
+        results: List[Optional[Dict]] = [None] * len(messages)
+        if not groups:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as pool:
+            futures = {pool.submit(self._deliver_group, [messages[i] for i in idx]): idx for idx in groups.values()}
+            for fut, idx in futures.items():
+                for i, r in zip(idx, fut.result()):
+                    results[i] = r
+        failed = [r for r in results if r["status"] == "failed"]
+        if failed:
+            log.warning("Verzenden: %d van %d mislukt (%s)", len(failed), len(results),
+                        ", ".join(f"{r['channel']} {r['target']}: {r['error']}" for r in failed[:5]))
+        return results
@@ -0,0 +1,137 @@
+import logging, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from .providers import PriceProvider
+
+log = logging.getLogger(__name__)
+
+class RateLimiter:
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def limiter_for(provider: PriceProvider) -> RateLimiter:
+    with _limiters_lock:
+        if provider.name not in _limiters:
+            _limiters[provider.name] = RateLimiter(provider.rate_limit)
+        return _limiters[provider.name]
+
+class DownloadReport:
+    def __init__(self):
+        self.failures: Dict[str, str] = {}
+        self.attempts: Dict[str, int] = {}
+        self.requests = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        ok = len(self.attempts) - len(self.failures)
+        return (f"{ok}/{len(self.attempts)} tickers in {self.batches} batches "
+                f"({self.requests} requests, {self.elapsed:.1f}s), {len(self.failures)} mislukt")
+
+class DownloadEngine:
+    def __init__(self, provider: PriceProvider, batch_size: Optional[int] = None, max_workers: int = 4,
+                 retries: int = 3, backoff: float = 0.5, timeout: Optional[float] = 30.0):
+        self.provider = provider
+        self.batch_size = max(1, batch_size or provider.batch_size)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = limiter_for(provider)
+        self._lock = threading.Lock()
+
+    def _batches(self, starts: Dict[str, pd.Timestamp]) -> List[Tuple[List[str], pd.Timestamp]]:
+        groups: Dict[pd.Timestamp, List[str]] = {}
+        for t, s in starts.items():
+            groups.setdefault(pd.Timestamp(s).normalize(), []).append(t)
+        return [(ts[i:i + self.batch_size], s) for s, ts in groups.items() for i in range(0, len(ts), self.batch_size)]
+
+    def _fetch(self, tickers: List[str], start: pd.Timestamp):
+        if self.timeout is None:
+            return self.provider.fetch_many(tickers, start, timeout=None)
+        # de provider respecteert de timeout niet altijd (yfinance); een hangende call laten we achter
+        box: Dict[str, object] = {}
+
+        def call():
+            try:
+                box["result"] = self.provider.fetch_many(tickers, start, timeout=self.timeout)
+            except BaseException as e:
+                box["error"] = e
+        th = threading.Thread(target=call, name="download-call", daemon=True)
+        th.start()
+        th.join(self.timeout)
+        if th.is_alive():
+            raise TimeoutError(f"geen antwoord binnen {self.timeout:g}s")
+        if "error" in box:
+            raise box["error"]
+        return box["result"]
+
+    def _run_batch(self, tickers: List[str], start: pd.Timestamp, report: DownloadReport):
+        pending, frames, errors = list(tickers), {}, {}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + 0.25 * random.random()))
+            self.limiter.acquire()
+            with self._lock:
+                report.requests += 1
+                for t in pending:
+                    report.attempts[t] = report.attempts.get(t, 0) + 1
+            try:
+                got, errs = self._fetch(pending, start)
+            except Exception as e:
+                errors.update({t: f"{type(e).__name__}: {e}" for t in pending})
+                continue
+            for t in pending:
+                errors.pop(t, None)
+                df = got.get(t)
+                if df is not None and not df.empty:
+                    frames[t] = df
+            errors.update(errs)
+            pending = [t for t in pending if t in errs]
+            if not pending:
+                break
+        for t in tickers:
+            if t not in frames and t not in errors:
+                errors[t] = "geen data"
+        return frames, errors
+
+    def download(self, starts: Dict[str, pd.Timestamp], report: Optional[DownloadReport] = None) -> Tuple[Dict[str, pd.DataFrame], DownloadReport]:
+        report = report or DownloadReport()
+        t0 = time.perf_counter()
+        batches = self._batches(starts)
+        report.batches += len(batches)
+        frames: Dict[str, pd.DataFrame] = {}
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                futures = [pool.submit(self._run_batch, ts, s, report) for ts, s in batches]
+                for fut in futures:
+                    got, errs = fut.result()
+                    frames.update(got)
+                    report.failures.update(errs)
+        report.elapsed += time.perf_counter() - t0
+        if report.failures:
+            log.warning("Download: %s (%s)", report.summary(),
+                        ", ".join(f"{t}: {e}" for t, e in sorted(report.failures.items())[:10]))
+        return frames, report
@@ -1,17 +1,93 @@
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+MIN_CLOSES = 60
+
+def _stacked_returns(prices: Dict[str, pd.DataFrame]) -> Tuple[list, np.ndarray, np.ndarray, np.ndarray]:
+    tickers, rets, last = [], [], []
+    for t, df in prices.items():
+        close = df["Close"].dropna()
+        if len(close) < MIN_CLOSES:
+            continue
+        tickers.append(t)
+        rets.append(np.diff(np.log(close.to_numpy(dtype=float))))
+        last.append(float(close.iloc[-1]))
+    lengths = np.array([len(r) for r in rets], dtype=np.int64)
+    Y = np.full((int(lengths.max()) if len(rets) else 0, len(rets)), np.nan)
+    for j, r in enumerate(rets):
+        Y[len(Y) - len(r):, j] = r
+    return tickers, Y, lengths, np.array(last)
+
+def trend_coefficients(Y: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    m = Y.shape[0]
+    mask = ~np.isnan(Y)
+    Y0 = np.where(mask, Y, 0.0)
+    n = lengths.astype(float)
+    offset = m - n
+    sy = Y0.sum(axis=0)
+    sky = np.arange(m, dtype=float) @ Y0 - offset * sy
+    xbar = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = (sky - xbar * sy) / sxx
+        a = sy / n - b * xbar
+    return a, b
+
+def _horizon_sum(a, b, n, horizon_days: int):
+    return horizon_days * a + b * (horizon_days * n + horizon_days * (horizon_days + 1) / 2)
 
 def simple_forecast(prices: Dict[str, pd.DataFrame], horizon_days: int = 5) -> Dict[str, float]:
-    out = {}
+    tickers, Y, lengths, last = _stacked_returns(prices)
+    if not tickers:
+        return {}
+    a, b = trend_coefficients(Y, lengths)
+    expected = _horizon_sum(a, b, lengths, horizon_days)
+    return {t: float(p) for t, p in zip(tickers, last * np.exp(expected))}
+
+def _walk_forward_one(close: pd.Series, horizon_days: int, window: Optional[int]) -> pd.DataFrame:
+    logp = np.log(close.to_numpy(dtype=float))
+    y = np.diff(logp)
+    k = np.arange(len(y), dtype=float)
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    cky = np.concatenate([[0.0], np.cumsum(k * y)])
+    # cutoff c = aantal returns in de fit; forecast vanaf close[c] voor close[c + horizon]
+    c = np.arange(MIN_CLOSES - 1, len(y) - horizon_days + 1)
+    if len(c) == 0:
+        return pd.DataFrame()
+    s = np.zeros_like(c) if window is None else np.maximum(c - window, 0)
+    n = (c - s).astype(float)
+    sy = cy[c] - cy[s]
+    sky = (cky[c] - cky[s]) - s * sy
+    xbar = (n - 1) / 2
+    b = (sky - xbar * sy) / (n * (n * n - 1) / 12)
+    a = sy / n - b * xbar
+    pred = _horizon_sum(a, b, n, horizon_days)
+    real = logp[c + horizon_days] - logp[c]
+    return pd.DataFrame({"date": close.index[c], "target_date": close.index[c + horizon_days],
+                         "pred_logret": pred, "real_logret": real,
+                         "pred_price": np.exp(logp[c] + pred), "real_price": np.exp(logp[c + horizon_days])})
+
+def walk_forward(prices: Dict[str, pd.DataFrame], horizon_days: int = 5, window: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    if window is not None and window < 2:
+        # een trendlijn door één punt heeft geen helling
+        raise ValueError(f"window moet minstens 2 zijn, niet {window}")
+    frames = []
     for t, df in prices.items():
         close = df["Close"].dropna()
-        if len(close) < 60: 
+        if len(close) < MIN_CLOSES + horizon_days:
             continue
-        ret = np.log(close).diff().dropna()
-        X = np.arange(len(ret)).reshape(-1,1)
-        model = LinearRegression().fit(X, ret.values)
-        expected = model.predict([[len(ret)+i] for i in range(1, horizon_days+1)]).sum()
-        out[t] = float(close.iloc[-1] * np.exp(expected))
-    return out
+        wf = _walk_forward_one(close, horizon_days, window)
+        if not wf.empty:
+            wf.insert(0, "ticker", t)
+            frames.append(wf)
+    if not frames:
+        return {"forecasts": pd.DataFrame(), "stats": pd.DataFrame()}
+    fc = pd.concat(frames, ignore_index=True)
+    err = fc["pred_logret"] - fc["real_logret"]
+    g = fc.assign(err=err, abs_err=err.abs(), sq_err=err ** 2,
+                  hit=np.sign(fc["pred_logret"]) == np.sign(fc["real_logret"]),
+                  ape=(fc["pred_price"] / fc["real_price"] - 1).abs()).groupby("ticker")
+    stats = pd.DataFrame({"n": g.size(), "mae": g["abs_err"].mean(), "rmse": np.sqrt(g["sq_err"].mean()),
+                          "bias": g["err"].mean(), "hit_rate": g["hit"].mean(), "mape_price": g["ape"].mean()})
+    return {"forecasts": fc, "stats": stats}
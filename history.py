@@ -0,0 +1,158 @@
+import os, uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCHEMAS = {
+    "signals": pa.schema([("date", pa.date32()), ("run_ts", pa.timestamp("s")), ("ticker", pa.string()),
+                          ("signal", pa.string()), ("close", pa.float64()), ("sma_s", pa.float64()),
+                          ("sma_l", pa.float64()), ("rsi", pa.float64()), ("macd", pa.float64()),
+                          ("macd_sig", pa.float64())]),
+    "forecasts": pa.schema([("date", pa.date32()), ("run_ts", pa.timestamp("s")), ("ticker", pa.string()),
+                            ("forecast", pa.float64())]),
+    "screener": pa.schema([("date", pa.date32()), ("run_ts", pa.timestamp("s")), ("sector", pa.string()),
+                           ("ticker", pa.string()), ("rank", pa.int32()), ("score", pa.float64())]),
+    "sectors": pa.schema([("date", pa.date32()), ("run_ts", pa.timestamp("s")), ("sector", pa.string()),
+                          ("tickers", pa.string()), ("avg_price", pa.float64()), ("count", pa.int64())]),
+}
+KEYS = {"signals": ["ticker"], "forecasts": ["ticker"], "screener": ["sector", "ticker"], "sectors": ["sector"]}
+ROW_GROUP = 8192  # gesorteerd op ticker: min/max per row group werkt als index
+COMPACT_AFTER = 32  # losse run-bestanden per maand voordat er automatisch wordt gecompacteerd
+DIFF_LOOKBACK_DAYS = 40
+
+def snapshot_frames(rep: Dict) -> Dict[str, pd.DataFrame]:
+    sig = pd.DataFrame.from_dict(rep.get("signals") or {}, orient="index")
+    fc = pd.Series(rep.get("forecast_5d") or {}, dtype=float)
+    screener = [{"sector": sec, "ticker": t, "rank": i, "score": float(score)}
+                for sec, items in (rep.get("opportunities") or {}).items() for i, (t, score) in enumerate(items, 1)]
+    return {
+        "signals": sig.rename_axis("ticker").reset_index() if not sig.empty else pd.DataFrame(columns=["ticker"]),
+        "forecasts": fc.rename("forecast").rename_axis("ticker").reset_index(),
+        "screener": pd.DataFrame(screener, columns=["sector", "ticker", "rank", "score"]),
+        "sectors": pd.DataFrame(rep.get("sector_report") or [], columns=["sector", "tickers", "avg_price", "count"]),
+    }
+
+class HistoryStore:
+    def __init__(self, root: str = "data/history"):
+        self.root = Path(root)
+
+    def _month_dirs(self, table: str, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> List[Path]:
+        base = self.root / table
+        if not base.exists():
+            return []
+        lo = start.strftime("%Y-%m") if start is not None else ""
+        hi = end.strftime("%Y-%m") if end is not None else "9999-99"
+        return sorted(d for d in base.glob("month=*") if lo <= d.name[6:] <= hi)
+
+    def append(self, rep: Dict, day=None, run_ts: Optional[datetime] = None) -> Dict[str, int]:
+        day = pd.Timestamp(day or rep.get("timestamp", "")[:10] or datetime.now()).date()
+        run_ts = run_ts or datetime.now().replace(microsecond=0)
+        written = {}
+        for table, df in snapshot_frames(rep).items():
+            if df.empty:
+                written[table] = 0
+                continue
+            df = df.assign(date=day, run_ts=run_ts)
+            tbl = pa.Table.from_pandas(df, schema=SCHEMAS[table], preserve_index=False)
+            month = self.root / table / f"month={day:%Y-%m}"
+            new_month = not month.exists()
+            month.mkdir(parents=True, exist_ok=True)
+            name = f"part-{run_ts:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+            pq.write_table(tbl, month / f"{name}.tmp")
+            os.replace(month / f"{name}.tmp", month / name)
+            written[table] = len(df)
+            if len(list(month.glob("part-*.parquet"))) >= COMPACT_AFTER:
+                self._compact_month(table, month)
+            if new_month:
+                # een dagelijkse run haalt COMPACT_AFTER niet: eerdere maanden compacteren zodra een nieuwe begint
+                for d in self._month_dirs(table, None, None):
+                    if d.name < month.name and any(d.glob("part-*.parquet")):
+                        self._compact_month(table, d)
+        return written
+
+    def query(self, table: str, start=None, end=None, tickers: Optional[List[str]] = None,
+              columns: Optional[List[str]] = None, latest: bool = True) -> pd.DataFrame:
+        schema = SCHEMAS[table]
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        files = [str(f) for d in self._month_dirs(table, start, end) for f in sorted(d.glob("*.parquet"))]
+        cols = list(dict.fromkeys(["date", "run_ts", *KEYS[table], *(columns or schema.names)]))
+        if not files:
+            return pd.DataFrame(columns=cols)
+        conds = []
+        if start is not None:
+            conds.append(ds.field("date") >= pa.scalar(start.date(), pa.date32()))
+        if end is not None:
+            conds.append(ds.field("date") <= pa.scalar(end.date(), pa.date32()))
+        if tickers is not None and "ticker" in schema.names:
+            tickers = list(tickers)
+            # '==' laat row groups via min/max sneller vallen dan isin
+            conds.append(ds.field("ticker") == tickers[0] if len(tickers) == 1 else ds.field("ticker").isin(tickers))
+        filt = None
+        for cond in conds:
+            filt = cond if filt is None else filt & cond
+        df = ds.dataset(files, schema=schema, format="parquet").to_table(columns=cols, filter=filt).to_pandas()
+        df["date"] = pd.to_datetime(df["date"])
+        if latest:
+            df = df.sort_values("run_ts", kind="stable").drop_duplicates(["date", *KEYS[table]], keep="last")
+        return df.sort_values(["date", *KEYS[table]], kind="stable").reset_index(drop=True)
+
+    def previous(self, table: str, upto, tickers: Optional[List[str]] = None, lookback_days: int = DIFF_LOOKBACK_DAYS) -> pd.DataFrame:
+        # laatste vastgelegde dag vóór 'upto': een herhaalde run op dezelfde dag vergelijkt nog steeds met de vorige dag
+        upto = pd.Timestamp(upto).normalize()
+        df = self.query(table, upto - timedelta(days=lookback_days), upto - timedelta(days=1), tickers)
+        return df.drop_duplicates(KEYS[table], keep="last").set_index(KEYS[table]) if not df.empty else df
+
+    def diff(self, signals: Dict[str, Dict], day=None) -> List[Dict]:
+        day = pd.Timestamp(day or datetime.now()).normalize()
+        prev = self.previous("signals", day, list(signals))
+        changes = []
+        for t, s in signals.items():
+            was = prev.loc[t] if not prev.empty and t in prev.index else None
+            if was is None or was["signal"] != s["signal"]:
+                changes.append({"ticker": t, "from": None if was is None else was["signal"], "to": s["signal"],
+                                "close": float(s["close"]), "since": None if was is None else was["date"].strftime("%Y-%m-%d")})
+        return changes
+
+    def flips(self, tickers: Optional[List[str]] = None, start=None, end=None) -> pd.DataFrame:
+        df = self.query("signals", start, end, tickers, columns=["signal", "close"])
+        if df.empty:
+            return df
+        df = df.sort_values(["ticker", "date"], kind="stable")
+        prev = df.groupby("ticker")["signal"].shift()
+        out = df.assign(previous=prev)[prev.notna() & (prev != df["signal"])]
+        return out[["date", "ticker", "previous", "signal", "close"]].reset_index(drop=True)
+
+    def _compact_month(self, table: str, month: Path, keep_intraday: bool = False) -> int:
+        files = sorted(month.glob("*.parquet"))
+        if len(files) < 2 and not any(f.name.startswith("part-") for f in files):
+            return 0
+        tbl = ds.dataset([str(f) for f in files], schema=SCHEMAS[table], format="parquet").to_table()
+        df = tbl.to_pandas()
+        if not keep_intraday:
+            df = df.sort_values("run_ts", kind="stable").drop_duplicates(["date", *KEYS[table]], keep="last")
+        df = df.sort_values([*KEYS[table], "date", "run_ts"], kind="stable")
+        out = pa.Table.from_pandas(df, schema=SCHEMAS[table], preserve_index=False)
+        pq.write_table(out, month / "data.parquet.tmp", row_group_size=ROW_GROUP, compression="zstd")
+        os.replace(month / "data.parquet.tmp", month / "data.parquet")
+        for f in files:
+            if f.name != "data.parquet":
+                f.unlink(missing_ok=True)
+        return len(files)
+
+    def compact(self, tables: Optional[List[str]] = None, keep_intraday: bool = False) -> Dict[str, int]:
+        done = {}
+        for table in tables or list(SCHEMAS):
+            done[table] = sum(self._compact_month(table, d, keep_intraday) for d in self._month_dirs(table, None, None))
+        return done
+
+def record(rep: Dict, cfg: Dict) -> List[Dict]:
+    store = HistoryStore(cfg["history"].get("dir", "data/history"))
+    day = pd.Timestamp(rep["timestamp"][:10])
+    changes = store.diff(rep.get("signals") or {}, day)
+    store.append(rep, day)
+    return changes
@@ -0,0 +1,227 @@
+import math
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from .signals import signal_codes, signal_labels
+
+# Incrementele indicatoren die dezelfde waarden geven als de batchversies uit `ta`
+# (SMAIndicator, RSIIndicator, MACD met fillna=False). Afwijking t.o.v. `ta`: |verschil| <= TOLERANCE
+# voor RSI (in punten) en <= TOLERANCE * prijs voor SMA/MACD; alleen afrondingsverschillen.
+TOLERANCE = 1e-8
+
+nan = float("nan")
+
+class RollingSMA:
+    def __init__(self, window: int):
+        self.window = int(window)
+        self._buf = deque()
+        self._sum = 0.0
+        self._since_resum = 0
+
+    def update(self, x: float) -> float:
+        self._buf.append(x)
+        self._sum += x
+        if len(self._buf) > self.window:
+            self._sum -= self._buf.popleft()
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._sum = math.fsum(self._buf)
+            self._since_resum = 0
+        return self.value
+
+    def peek(self, x: float) -> float:
+        if len(self._buf) + 1 < self.window:
+            return nan
+        drop = self._buf[0] if len(self._buf) == self.window else 0.0
+        return (self._sum - drop + x) / self.window
+
+    @property
+    def value(self) -> float:
+        return self._sum / self.window if len(self._buf) == self.window else nan
+
+class EMA:
+    def __init__(self, alpha: float, min_periods: int = 1):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.count = 0
+        self._y = nan
+
+    @classmethod
+    def from_span(cls, span: int) -> "EMA":
+        return cls(2.0 / (span + 1), span)
+
+    def update(self, x: float) -> float:
+        self._y = x if self.count == 0 else (1 - self.alpha) * self._y + self.alpha * x
+        self.count += 1
+        return self.value
+
+    def peek(self, x: float) -> float:
+        if self.count + 1 < self.min_periods:
+            return nan
+        return x if self.count == 0 else (1 - self.alpha) * self._y + self.alpha * x
+
+    @property
+    def value(self) -> float:
+        return self._y if self.count >= self.min_periods else nan
+
+class WilderRSI:
+    def __init__(self, window: int = 14):
+        self.up = EMA(1.0 / window, window)
+        self.down = EMA(1.0 / window, window)
+        self._prev: Optional[float] = None
+
+    @staticmethod
+    def _rsi(up: float, down: float) -> float:
+        if math.isnan(up) or math.isnan(down):
+            return nan
+        return 100.0 if down == 0 else 100 - 100 / (1 + up / down)
+
+    def _moves(self, x: float):
+        diff = 0.0 if self._prev is None else x - self._prev
+        return max(diff, 0.0), max(-diff, 0.0)
+
+    def update(self, x: float) -> float:
+        u, d = self._moves(x)
+        self._prev = x
+        return self._rsi(self.up.update(u), self.down.update(d))
+
+    def peek(self, x: float) -> float:
+        u, d = self._moves(x)
+        return self._rsi(self.up.peek(u), self.down.peek(d))
+
+    @property
+    def value(self) -> float:
+        return self._rsi(self.up.value, self.down.value)
+
+class MACDState:
+    def __init__(self, fast: int = 12, slow: int = 26, sign: int = 9):
+        self.fast, self.slow, self.signal = EMA.from_span(fast), EMA.from_span(slow), EMA.from_span(sign)
+
+    def update(self, x: float):
+        macd = self.fast.update(x) - self.slow.update(x)
+        sig = self.signal.update(macd) if not math.isnan(macd) else nan
+        return macd, sig
+
+    def peek(self, x: float):
+        macd = self.fast.peek(x) - self.slow.peek(x)
+        return macd, (self.signal.peek(macd) if not math.isnan(macd) else nan)
+
+class IndicatorState:
+    def __init__(self, ma_short=20, ma_long=50, rsi_period=14):
+        self.sma_s, self.sma_l = RollingSMA(ma_short), RollingSMA(ma_long)
+        self.rsi, self.macd = WilderRSI(rsi_period), MACDState()
+        self.last: Optional[Dict[str, float]] = None
+
+    def update(self, close: float) -> Dict[str, float]:
+        macd, sig = self.macd.update(close)
+        self.last = {"Close": close, "SMA_S": self.sma_s.update(close), "SMA_L": self.sma_l.update(close),
+                     "RSI": self.rsi.update(close), "MACD": macd, "MACD_SIG": sig}
+        return self.last
+
+    def peek(self, close: float) -> Dict[str, float]:
+        macd, sig = self.macd.peek(close)
+        return {"Close": close, "SMA_S": self.sma_s.peek(close), "SMA_L": self.sma_l.peek(close),
+                "RSI": self.rsi.peek(close), "MACD": macd, "MACD_SIG": sig}
+
+    def seed(self, closes: pd.Series) -> Optional[Dict[str, float]]:
+        for x in closes.to_numpy(dtype=float):
+            self.update(x)
+        return self.last
+
+def _complete(row: Optional[Dict[str, float]]) -> bool:
+    return row is not None and not any(math.isnan(v) for v in row.values())
+
+class LiveSignals:
+    def __init__(self, params: Dict, on_change: Optional[Callable[[Dict], None]] = None):
+        self.params = params
+        self.on_change = on_change
+        self.states: Dict[str, IndicatorState] = {}
+        self.last_ts: Dict[str, pd.Timestamp] = {}
+        # eerste en laatste verwerkte bar per ticker: verandert die, dan is de historie aangepast
+        self._seen: Dict[str, List] = {}
+        self.rows: Dict[str, Dict[str, float]] = {}
+        self.signals: Dict[str, str] = {}
+        self.changes: List[Dict] = []
+
+    def _signal(self, row: Dict[str, float]) -> str:
+        code = signal_codes(row["SMA_S"], row["SMA_L"], row["RSI"], row["MACD"], row["MACD_SIG"],
+                            self.params["rsi_buy"], self.params["rsi_sell"])
+        return str(signal_labels(code))
+
+    def _emit(self, ticker: str, ts, row: Dict[str, float]) -> Optional[Dict]:
+        if not _complete(row):
+            return None
+        self.rows[ticker] = row
+        sig, prev = self._signal(row), self.signals.get(ticker)
+        self.signals[ticker] = sig
+        if prev is None or prev == sig:
+            return None
+        change = {"ticker": ticker, "time": ts, "from": prev, "to": sig, "close": row["Close"]}
+        self.changes.append(change)
+        if self.on_change:
+            self.on_change(change)
+        return change
+
+    def _state(self, ticker: str) -> IndicatorState:
+        if ticker not in self.states:
+            p = self.params
+            self.states[ticker] = IndicatorState(p["ma_short"], p["ma_long"], p["rsi_period"])
+        return self.states[ticker]
+
+    def _consumed(self, ticker: str, ts, close: float):
+        ts = pd.Timestamp(ts)
+        seen = self._seen.setdefault(ticker, [ts, float(close), float(close)])
+        seen[2] = float(close)
+        self.last_ts[ticker] = ts
+
+    def _rewritten(self, ticker: str, close: pd.Series) -> bool:
+        first_ts, first, last = self._seen[ticker]
+        for ts, x in ((first_ts, first), (self.last_ts[ticker], last)):
+            if ts not in close.index or not abs(float(close[ts]) - x) <= 1e-6 * abs(x):
+                return True
+        return False
+
+    def update_bar(self, ticker: str, ts, close: float) -> Optional[Dict]:
+        row = self._state(ticker).update(float(close))
+        self._consumed(ticker, ts, close)
+        return self._emit(ticker, ts, row)
+
+    def update_frame(self, ticker: str, df: pd.DataFrame) -> List[Dict]:
+        close = df["Close"].dropna()
+        if ticker in self.last_ts and self._rewritten(ticker, close):
+            # cache heeft de historie aangepast (split/dividend): state opnieuw opbouwen; het laatste
+            # signaal blijft staan, zodat een wissel t.o.v. vóór de aanpassing nog wordt gemeld
+            for d in (self.states, self.last_ts, self._seen):
+                d.pop(ticker, None)
+        if ticker in self.last_ts:
+            close = close.iloc[close.index.searchsorted(self.last_ts[ticker], side="right"):]
+        if close.empty:
+            return []
+        if ticker not in self.states and len(close) > 1:
+            self._state(ticker).seed(close.iloc[:-1])
+            self._consumed(ticker, close.index[0], close.iloc[0])
+            close = close.iloc[-1:]
+        changes = [self.update_bar(ticker, ts, x) for ts, x in close.items()]
+        return [c for c in changes if c]
+
+    def update_quote(self, ticker: str, price: float, ts=None) -> Optional[Dict]:
+        # intraday: herbeoordeel de lopende (nog niet gesloten) bar zonder de state te wijzigen
+        if ticker not in self.states:
+            return None
+        row = self.states[ticker].peek(float(price))
+        if not _complete(row):
+            return None
+        sig = self._signal(row)
+        prev = self.signals.get(ticker)
+        return None if prev is None or sig == prev else {"ticker": ticker, "time": ts, "from": prev, "to": sig, "close": float(price), "provisional": True}
+
+    def snapshot(self, tickers=None) -> Dict[str, Dict]:
+        out = {}
+        for t in (tickers if tickers is not None else self.rows):
+            if t not in self.rows:
+                continue
+            r = self.rows[t]
+            out[t] = {"signal": self.signals[t], "close": float(r["Close"]), "sma_s": float(r["SMA_S"]),
+                      "sma_l": float(r["SMA_L"]), "rsi": float(r["RSI"]), "macd": float(r["MACD"]),
+                      "macd_sig": float(r["MACD_SIG"])}
+        return out
@@ -0,0 +1,130 @@
+import hashlib, json, sys, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+def make_key(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def file_hash(path: str) -> str:
+    p = Path(path)
+    return hashlib.sha256(p.read_bytes()).hexdigest()[:16] if p.exists() else "missing"
+
+def bar_dates(prices) -> Dict[str, str]:
+    # laatste bar per ticker: een sleutel verandert pas als er echt een nieuwe koers is (niet op feestdagen of voor de slot)
+    return {t: str(df.index[-1])[:10] for t, df in sorted(prices.items()) if len(df)}
+
+def estimate_size(value: Any) -> int:
+    if hasattr(value, "memory_usage"):
+        try:
+            mem = value.memory_usage(deep=True)
+            return int(mem.sum()) if hasattr(mem, "sum") else int(mem)
+        except Exception:
+            pass
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.coalesced = 0
+
+    def _live(self, key: str) -> bool:
+        if key not in self._data:
+            return False
+        if key in self._expires and self._expires[key] <= time.monotonic():
+            self._drop(key)
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            if ttl is not None:
+                self._expires[key] = time.monotonic() + ttl
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._data) > 1)):
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key: str):
+        self._data.pop(key, None)
+        self._sizes.pop(key, None)
+        self._expires.pop(key, None)
+
+    def get_or_compute(self, key: str, fn: Callable[[], Any], ttl: Optional[float] = None):
+        # gelijktijdige aanvragen voor dezelfde key wachten op één berekening
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            fut = self._inflight.get(key)
+            if fut is None:
+                self.misses += 1
+                fut = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return fut.result()
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self.put(key, value, ttl)
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+        return value
+
+    def discard(self, key: str):
+        with self._lock:
+            self._drop(key)
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._data), "mb": round(self.nbytes / 1e6, 1), "hits": self.hits,
+                    "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else None,
+                    "evictions": self.evictions, "coalesced": self.coalesced}
@@ -0,0 +1,178 @@
+import io, os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from ta.trend import SMAIndicator, MACD
+from ta.momentum import RSIIndicator
+from .backtest import _metrics
+from .panel import PricePanel
+from .params import PARAM_KEYS
+from .signals import signal_codes
+
+COLUMNS = PARAM_KEYS + ["cagr", "sharpe", "max_drawdown", "hit_ratio", "turnover"]
+
+def parse_grid_values(s: str) -> List[float]:
+    vals = []
+    for part in str(s).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            start, stop, *step = [float(x) for x in part.split(":")]
+            step = step[0] if step else 1.0
+            vals.extend(np.arange(start, stop + step / 2, step).tolist())
+        else:
+            vals.append(float(part))
+    return [int(v) if float(v).is_integer() else v for v in vals]
+
+def param_grid(grid: Dict[str, List]) -> List[Dict[str, Any]]:
+    combos = [dict(zip(PARAM_KEYS, vals)) for vals in product(*(grid[k] for k in PARAM_KEYS))]
+    return [c for c in combos if c["ma_short"] < c["ma_long"] and c["rsi_buy"] < c["rsi_sell"]]
+
+def indicator_panel(prices: Dict[str, pd.DataFrame], ma_windows, rsi_periods, shared: bool = False) -> PricePanel:
+    fields = ["Close", *(f"SMA_{w}" for w in sorted(set(ma_windows))), *(f"RSI_{p}" for p in sorted(set(rsi_periods))),
+              "MACD", "MACD_SIG"]
+    closes = {t: df["Close"].dropna() for t, df in prices.items()}
+    closes = {t: c[~c.index.duplicated(keep="last")] for t, c in closes.items() if not c.empty}
+    dates = pd.DatetimeIndex([])
+    for c in closes.values():
+        dates = dates.union(c.index)
+    panel = PricePanel.empty(dates.sort_values(), list(closes), fields, shared=shared)
+    try:
+        for j, (t, close) in enumerate(closes.items()):
+            pos = panel.dates.get_indexer(close.index)
+            col = {"Close": close}
+            for w in sorted(set(ma_windows)):
+                col[f"SMA_{w}"] = SMAIndicator(close=close, window=int(w)).sma_indicator()
+            for p in sorted(set(rsi_periods)):
+                col[f"RSI_{p}"] = RSIIndicator(close=close, window=int(p)).rsi()
+            macd = MACD(close=close)
+            col["MACD"], col["MACD_SIG"] = macd.macd(), macd.macd_signal()
+            for i, f in enumerate(fields):
+                panel.values[i, j, pos] = col[f].to_numpy(dtype=float)
+            panel.valid[j, pos] = True
+    except BaseException:
+        if shared:
+            panel.unlink()
+        raise
+    return panel
+
+_worker_state: Dict[str, Any] = {}
+
+def _init_worker(handle, weights):
+    # alleen de handle wordt gepickled; de indicatoren zelf liggen in gedeeld geheugen
+    _worker_state["panel"], _worker_state["weights"] = PricePanel.attach(handle), weights
+
+def _evaluate_group(key, combos: List[Dict[str, Any]], panel: Optional[PricePanel] = None, weights=None) -> List[Dict[str, Any]]:
+    panel = panel if panel is not None else _worker_state["panel"]
+    weights = weights if weights is not None else _worker_state["weights"]
+    ma_s, ma_l, rsi_p = key
+    F = [panel.fields.index(f) for f in (f"SMA_{ma_s}", f"SMA_{ma_l}", f"RSI_{rsi_p}", "MACD", "MACD_SIG")]
+    close_f = panel.fields.index("Close")
+    legs = []
+    for j, t in enumerate(panel.tickers):
+        on = panel.valid[j]
+        arr = panel.values[F, j][:, on].T
+        valid = ~np.isnan(arr).any(axis=1)
+        if not valid.any():
+            continue
+        pos_idx = np.flatnonzero(on)[valid]
+        close = panel.values[close_f, j, pos_idx]
+        ret = np.nan_to_num(close[1:] / close[:-1] - 1.0)
+        legs.append((t, pos_idx, arr[valid], np.concatenate([[0.0], ret])))
+    if not legs:
+        return [dict(cb, cagr=float("nan"), sharpe=float("nan"), max_drawdown=float("nan"), hit_ratio=float("nan")) for cb in combos]
+    used = np.zeros(len(panel.dates), dtype=bool)
+    for _, pos_idx, _, _ in legs:
+        used[pos_idx] = True
+    union = panel.dates[used]
+    slot = np.cumsum(used) - 1
+    slots = [(t, slot[pos_idx], arr, ret) for t, pos_idx, arr, ret in legs]
+    w = np.array([weights.get(t, 0.0) for t, _, _, _ in slots])
+    rows = []
+    for (rsi_buy, rsi_sell), sub in pd.DataFrame(combos).groupby(["rsi_buy", "rsi_sell"], sort=False):
+        gross = np.zeros((len(union), len(slots)))
+        trades = np.zeros_like(gross)
+        for j, (t, pos_idx, arr, ret) in enumerate(slots):
+            pos = np.concatenate([[0.0], signal_codes(*arr.T, rsi_buy, rsi_sell)[:-1]])
+            gross[pos_idx, j] = pos * ret
+            trades[pos_idx, j] = np.abs(np.diff(pos, prepend=pos[0]))
+        for cb in sub.to_dict(orient="records"):
+            net = (gross - trades * (cb["cost_bps"] / 10000.0)) @ w
+            rows.append({**{k: cb[k] for k in PARAM_KEYS}, **_metrics(pd.Series(net, index=union)),
+                         "turnover": float((trades @ np.abs(w)).sum())})
+    return rows
+
+def _read_checkpoint(path: Path) -> pd.DataFrame:
+    data = path.read_bytes()
+    cut = data.rfind(b"\n") + 1
+    if cut < len(data):
+        # onvolledige laatste regel van een afgebroken schrijfactie afkappen, zodat nieuwe rijen op een schone regel beginnen
+        with open(path, "r+b") as f:
+            f.truncate(cut)
+    text = data[:cut].decode("utf-8")
+    return pd.read_csv(io.StringIO(text)) if text.count("\n") > 1 else pd.DataFrame()
+
+def _append_checkpoint(path: Path, rows: pd.DataFrame):
+    # alleen de rijen van deze groep toevoegen; header alleen in een nieuw bestand
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        rows.to_csv(f, index=False, header=f.tell() == 0, lineterminator="\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def _key(row: Dict[str, Any]) -> tuple:
+    return tuple(float(row[k]) for k in PARAM_KEYS)
+
+def optimize(prices: Dict[str, pd.DataFrame], grid: Dict[str, List], weights: Optional[Dict[str, float]] = None,
+             workers: Optional[int] = None, checkpoint: Optional[str] = None, sort_by: str = "sharpe") -> pd.DataFrame:
+    tickers = list(prices.keys())
+    weights = weights or {t: 1 / len(tickers) for t in tickers}
+    combos = param_grid(grid)
+    done = pd.DataFrame()
+    if checkpoint and Path(checkpoint).exists():
+        done = _read_checkpoint(Path(checkpoint))
+        seen = {_key(r) for r in done.to_dict(orient="records")}
+        combos = [c for c in combos if _key(c) not in seen]
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for c in combos:
+        groups.setdefault((c["ma_short"], c["ma_long"], c["rsi_period"]), []).append(c)
+    results = [done] if not done.empty else []
+    if groups:
+        workers = workers if workers is not None else min(len(groups), os.cpu_count() or 1)
+        # bij meerdere workers direct in gedeeld geheugen opbouwen: geen tweede, private kopie
+        panel = indicator_panel(prices, grid["ma_short"] + grid["ma_long"], grid["rsi_period"], shared=workers > 1)
+
+        def collect(rows):
+            results.append(pd.DataFrame(rows, columns=COLUMNS))
+            if checkpoint:
+                _append_checkpoint(Path(checkpoint), results[-1])
+
+        if workers <= 1:
+            for key, cbs in groups.items():
+                collect(_evaluate_group(key, cbs, panel, weights))
+        else:
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panel.handle(), weights)) as pool:
+                    futures = [pool.submit(_evaluate_group, key, cbs) for key, cbs in groups.items()]
+                    for fut in futures:
+                        collect(fut.result())
+            finally:
+                panel.unlink()
+    if not results:
+        return pd.DataFrame(columns=COLUMNS)
+    out = pd.concat(results, ignore_index=True)
+    out = out.sort_values(sort_by, ascending=False, na_position="last").reset_index(drop=True)
+    out.insert(0, "rank", np.arange(1, len(out) + 1))
+    return out
+
+def save_results(df: pd.DataFrame, path: str):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
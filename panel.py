@@ -0,0 +1,174 @@
+import json
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # < 3.13: aanmelding bij de resource tracker meteen intrekken, anders ruimt die het segment van de eigenaar op
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def _date_values(dates: pd.DatetimeIndex) -> np.ndarray:
+    return (dates.tz_convert("UTC").tz_localize(None) if dates.tz else dates).to_numpy()
+
+def _dates(values: np.ndarray, tz: Optional[str], name: Optional[str]) -> pd.DatetimeIndex:
+    dates = pd.DatetimeIndex(values, name=name)
+    return dates.tz_localize("UTC").tz_convert(tz) if tz else dates
+
+def _date_meta(dates: pd.DatetimeIndex) -> Dict:
+    return {"tz": str(dates.tz) if dates.tz else None, "index_name": dates.name}
+
+# values[veld, ticker, datum] op één gesorteerde datumindex: per ticker aaneengesloten, dus een
+# tickerview kost geen kopie; field() geeft dezelfde data als datum × ticker. valid = slotkoers aanwezig.
+class PricePanel:
+    def __init__(self, dates: pd.DatetimeIndex, tickers: Sequence[str], values: np.ndarray,
+                 valid: Optional[np.ndarray] = None, fields: Sequence[str] = FIELDS, _shm=None, _path: Optional[str] = None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.fields = list(fields)
+        if values.shape != (len(self.fields), len(self.tickers), len(self.dates)):
+            raise ValueError(f"values heeft vorm {values.shape}, verwacht "
+                             f"{(len(self.fields), len(self.tickers), len(self.dates))}")
+        self.values = values
+        self.valid = valid if valid is not None else ~np.isnan(values[self.fields.index("Close")])
+        self._col = {t: j for j, t in enumerate(self.tickers)}
+        self._fld = {f: i for i, f in enumerate(self.fields)}
+        self._shm = _shm
+        self._path = _path
+
+    @classmethod
+    def empty(cls, dates: pd.DatetimeIndex, tickers: Sequence[str], fields: Sequence[str] = FIELDS,
+              dtype=np.float64, shared: bool = False) -> "PricePanel":
+        shape = (len(fields), len(tickers), len(dates))
+        if not shared:
+            return cls(dates, tickers, np.full(shape, np.nan, dtype=dtype), np.zeros(shape[1:], dtype=bool), fields)
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes + shape[1] * shape[2]))
+        values = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        values.fill(np.nan)
+        valid = np.ndarray(shape[1:], dtype=bool, buffer=shm.buf, offset=nbytes)
+        valid.fill(False)
+        return cls(dates, tickers, values, valid, fields, _shm=shm)
+
+    @classmethod
+    def from_dict(cls, prices: Dict[str, pd.DataFrame], fields: Sequence[str] = FIELDS, dtype=np.float64,
+                  shared: bool = False) -> "PricePanel":
+        frames = {t: df[~df.index.duplicated(keep="last")] for t, df in prices.items() if df is not None and not df.empty}
+        dates = pd.DatetimeIndex([])
+        for df in frames.values():
+            dates = dates.union(df.index)
+        names = {df.index.name for df in frames.values()}
+        panel = cls.empty(dates.sort_values().rename(names.pop() if len(names) == 1 else None), list(frames), fields, dtype, shared)
+        for j, (t, df) in enumerate(frames.items()):
+            pos = panel.dates.get_indexer(df.index)
+            for i, f in enumerate(panel.fields):
+                if f in df.columns:
+                    panel.values[i, j, pos] = df[f].to_numpy(dtype=dtype, na_value=np.nan)
+            if "Close" in df.columns:
+                panel.valid[j, pos] = df["Close"].notna().to_numpy()
+        return panel
+
+    def to_dict(self, tickers: Optional[Sequence[str]] = None) -> Dict[str, pd.DataFrame]:
+        return {t: self.frame(t) for t in (tickers if tickers is not None else self.tickers) if self.valid[self._col[t]].any()}
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._col
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.valid.nbytes
+
+    def field(self, name: str) -> np.ndarray:
+        return self.values[self._fld[name]].T
+
+    def matrix(self, name: str = "Close") -> pd.DataFrame:
+        return pd.DataFrame(self.field(name), index=self.dates, columns=self.tickers, copy=False)
+
+    def view(self, ticker: str) -> pd.DataFrame:
+        # volledige datumindex, geen kopie: ongeldige rijen zijn NaN
+        return pd.DataFrame(self.values[:, self._col[ticker], :].T, index=self.dates, columns=self.fields, copy=False)
+
+    def frame(self, ticker: str) -> pd.DataFrame:
+        m = self.valid[self._col[ticker]]
+        return pd.DataFrame(self.values[:, self._col[ticker], m].T, index=self.dates[m], columns=self.fields)
+
+    def series(self, ticker: str, field: str = "Close") -> pd.Series:
+        j = self._col[ticker]
+        m = self.valid[j]
+        return pd.Series(self.values[self._fld[field], j, m], index=self.dates[m], name=field)
+
+    def select(self, tickers: Sequence[str]) -> "PricePanel":
+        idx = [self._col[t] for t in tickers]
+        return PricePanel(self.dates, tickers, self.values[:, idx, :], self.valid[idx], self.fields)
+
+    def to_shared(self) -> "PricePanel":
+        out = PricePanel.empty(self.dates, self.tickers, self.fields, self.values.dtype, shared=True)
+        out.values[...] = self.values
+        out.valid[...] = self.valid
+        return out
+
+    def handle(self) -> Dict:
+        # klein en picklebaar: workers koppelen hiermee aan hetzelfde geheugen
+        if self._shm is not None:
+            return {"kind": "shm", "name": self._shm.name, "dates": _date_values(self.dates), **_date_meta(self.dates),
+                    "tickers": self.tickers, "fields": self.fields, "dtype": self.values.dtype.str}
+        if self._path is None:
+            raise ValueError("Panel staat niet in gedeeld geheugen of in een bestand (gebruik to_shared of save)")
+        return {"kind": "file", "path": self._path}
+
+    @classmethod
+    def attach(cls, handle: Dict) -> "PricePanel":
+        if handle["kind"] == "file":
+            return cls.load(handle["path"])
+        shape = (len(handle["fields"]), len(handle["tickers"]), len(handle["dates"]))
+        dtype = np.dtype(handle["dtype"])
+        shm = _attach_shm(handle["name"])
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        values = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        valid = np.ndarray(shape[1:], dtype=bool, buffer=shm.buf, offset=nbytes)
+        return cls(_dates(handle["dates"], handle["tz"], handle["index_name"]), handle["tickers"], values, valid, handle["fields"], _shm=shm)
+
+    def save(self, path: str) -> "PricePanel":
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "values.npy", self.values)
+        np.save(path / "valid.npy", self.valid)
+        np.save(path / "dates.npy", _date_values(self.dates))
+        (path / "meta.json").write_text(json.dumps({"tickers": self.tickers, "fields": self.fields,
+                                                    **_date_meta(self.dates)}), encoding="utf-8")
+        return PricePanel.load(str(path))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PricePanel":
+        path = Path(path)
+        mode = "r" if mmap else None
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        return cls(_dates(np.load(path / "dates.npy"), meta["tz"], meta["index_name"]), meta["tickers"], np.load(path / "values.npy", mmap_mode=mode),
+                   np.load(path / "valid.npy", mmap_mode=mode), meta["fields"], _path=str(path) if mmap else None)
+
+    def close(self):
+        if self._shm is not None:
+            # views eerst loslaten, anders weigert SharedMemory.close de buffer
+            self.values = self.valid = None
+            self._shm.close()
+
+    def unlink(self):
+        shm = self._shm
+        self.close()
+        if shm is not None:
+            # workers delen (fork/spawn) de resource tracker en kunnen onze aanmelding daar hebben ingetrokken;
+            # opnieuw aanmelden is idempotent en houdt het afmelden in unlink() geldig
+            resource_tracker.register(shm._name, "shared_memory")
+            shm.unlink()
@@ -0,0 +1,2 @@
+# zonder zware imports: de CLI bouwt hiermee de optimize-opties zonder pandas te laden
+PARAM_KEYS = ["ma_short", "ma_long", "rsi_period", "rsi_buy", "rsi_sell", "cost_bps"]
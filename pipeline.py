@@ -0,0 +1,100 @@
+import threading, time, tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = (), default: Any = None,
+                 optional: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.default = default
+        # optionele invoer: de stage wacht erop, maar draait ook als die mislukt (met de default van die invoer)
+        self.optional = tuple(optional)
+
+class _MemoryProbe:
+    # tracemalloc is proceswijd: bij overlappende stages is de piek een bovengrens voor elke stage
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.owner = enabled and not tracemalloc.is_tracing()
+        self._lock = threading.Lock()
+        self._running = 0
+        if self.owner:
+            tracemalloc.start()
+
+    def enter(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            if self._running == 0:
+                tracemalloc.reset_peak()
+            self._running += 1
+            return tracemalloc.get_traced_memory()[0]
+
+    def exit(self, base: int) -> float:
+        if not self.enabled:
+            return float("nan")
+        with self._lock:
+            self._running -= 1
+            return max(tracemalloc.get_traced_memory()[1] - base, 0) / 1e6
+
+    def close(self):
+        if self.owner:
+            tracemalloc.stop()
+
+def _run_one(stage: Stage, kwargs: Dict[str, Any], probe: _MemoryProbe):
+    base = probe.enter()
+    t0, c0 = time.perf_counter(), time.thread_time()
+    try:
+        value, err = stage.fn(**kwargs), None
+    except Exception as e:
+        value, err = stage.default, f"{type(e).__name__}: {e}"
+    timing = {"wall_s": time.perf_counter() - t0, "cpu_s": time.thread_time() - c0, "peak_mem_mb": probe.exit(base)}
+    return value, err, timing
+
+def run_stages(stages: List[Stage], max_workers: int = 4, trace_memory: bool = False) -> Tuple[Dict[str, Any], Dict[str, Dict], Dict[str, str]]:
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in (*s.deps, *s.optional) if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage {s.name} mist afhankelijkheden: {missing}")
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    pending = list(stages)
+    running = {}
+    probe = _MemoryProbe(trace_memory)
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for s in list(pending):
+                        failed = [d for d in s.deps if d in errors]
+                        if failed:
+                            pending.remove(s)
+                            results[s.name] = s.default
+                            errors[s.name] = f"overgeslagen: {', '.join(failed)} mislukt"
+                            timings[s.name] = {"wall_s": 0.0, "cpu_s": 0.0, "peak_mem_mb": 0.0, "status": "skipped"}
+                            progressed = True
+                        elif all(d in results for d in (*s.deps, *s.optional)):
+                            pending.remove(s)
+                            running[pool.submit(_run_one, s, {d: results[d] for d in (*s.deps, *s.optional)}, probe)] = s
+                if not running:
+                    if pending:
+                        raise ValueError(f"Cyclische afhankelijkheden: {[s.name for s in pending]}")
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    s = running.pop(fut)
+                    value, err, timing = fut.result()
+                    results[s.name] = value
+                    timings[s.name] = {**timing, "status": "failed" if err else "ok"}
+                    if err:
+                        errors[s.name] = err
+    finally:
+        probe.close()
+    timings["total"] = {"wall_s": time.perf_counter() - t0}
+    return results, timings, errors
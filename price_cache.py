@@ -0,0 +1,201 @@
+import copy, json, logging, os, threading, uuid
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+from .downloader import DownloadEngine, DownloadReport
+from .providers import PriceProvider, YahooProvider, normalize_ohlcv
+
+log = logging.getLogger(__name__)
+
+class PriceCache:
+    def __init__(self, root: Optional[str] = "data/prices", provider: Optional[PriceProvider] = None,
+                 max_age_hours: float = 4.0, overlap_days: int = 7, rtol: float = 1e-6,
+                 engine: Optional[DownloadEngine] = None):
+        self.root = Path(root) if root else None
+        self.provider = provider or YahooProvider()
+        self.engine = engine or DownloadEngine(self.provider)
+        self.last_report = DownloadReport()
+        self.max_age = timedelta(hours=max_age_hours)
+        self.overlap = timedelta(days=overlap_days)
+        self.rtol = rtol
+        # frames blijven ook met een schijfmap in het geheugen; schijf is alleen de persistente laag
+        self._mem: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+        self._index = self._load_index()
+        self.stats = {"disk_hits": 0, "delta_fetches": 0, "full_fetches": 0, "recovered": 0}
+
+    def with_max_age(self, max_age_hours: float) -> "PriceCache":
+        # zelfde index, frames en locks (dus één index.json), alleen een andere verversingstermijn
+        other = copy.copy(self)
+        other.max_age = timedelta(hours=max_age_hours)
+        other.stats = dict.fromkeys(self.stats, 0)
+        other.last_report = DownloadReport()
+        return other
+
+    def _path(self, ticker: str) -> Path:
+        safe = "".join(c if c.isalnum() or c in ".-_^=" else "_" for c in ticker)
+        return self.root / f"{safe}.parquet"
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not self.root:
+            return {}
+        try:
+            return json.loads((self.root / "index.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        if not self.root:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"index.json.{uuid.uuid4().hex[:8]}.tmp"
+        tmp.write_text(json.dumps(self._index, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.root / "index.json")
+
+    def load(self, ticker: str) -> Optional[pd.DataFrame]:
+        df = self._mem.get(ticker)
+        if df is not None or not self.root:
+            return df
+        path = self._path(ticker)
+        if not path.exists():
+            return None
+        try:
+            df = pd.read_parquet(path)
+            if "Close" not in df.columns or not isinstance(df.index, pd.DatetimeIndex):
+                raise ValueError("onverwacht schema")
+            with self._lock:
+                self._mem[ticker] = df
+            return df
+        except Exception as e:
+            log.warning("Cache voor %s onleesbaar, wordt opnieuw opgebouwd: %s", ticker, e)
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._index.pop(ticker, None)
+                self.stats["recovered"] += 1
+            return None
+
+    def store(self, ticker: str, df: pd.DataFrame, covered_from: pd.Timestamp):
+        with self._lock:
+            self._index[ticker] = {"covered_from": str(pd.Timestamp(covered_from).date()),
+                                   "checked": datetime.now().isoformat(timespec="seconds")}
+            self._mem[ticker] = df
+        if not self.root:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(ticker)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    def is_fresh(self, ticker: str, start: pd.Timestamp) -> bool:
+        meta = self._index.get(ticker)
+        if not meta:
+            return False
+        if pd.Timestamp(meta["covered_from"]) > start:
+            return False
+        return datetime.now() - datetime.fromisoformat(meta["checked"]) < self.max_age
+
+    def plan(self, ticker: str, start: pd.Timestamp):
+        cached = self.load(ticker)
+        if cached is None or cached.empty:
+            return None, start, start
+        if self.is_fresh(ticker, start):
+            return cached, None, None
+        covered = pd.Timestamp(self._index.get(ticker, {}).get("covered_from", cached.index[0]))
+        if covered > start:
+            return None, start, start
+        return cached, cached.index[-1] - self.overlap, covered
+
+    def merge(self, cached: Optional[pd.DataFrame], fresh: pd.DataFrame) -> Optional[pd.DataFrame]:
+        fresh = normalize_ohlcv(fresh)
+        if cached is None:
+            return fresh if not fresh.empty else None
+        if fresh.empty:
+            return cached
+        common = cached.index.intersection(fresh.index)
+        if len(common):
+            old, new = cached.loc[common, "Close"], fresh.loc[common, "Close"]
+            if ((old - new).abs() > self.rtol * new.abs()).any():
+                return None
+        return pd.concat([cached[cached.index < fresh.index[0]], fresh])
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _locked(self, tickers) -> ExitStack:
+        # één lock per ticker, altijd in dezelfde volgorde: gelijktijdige aanvragen voor dezelfde
+        # ticker wachten op elkaar (en vinden daarna een verse cache), andere tickers lopen door
+        with self._lock:
+            locks = [self._ticker_locks.setdefault(t, threading.Lock()) for t in sorted(set(tickers))]
+        stack = ExitStack()
+        for lock in locks:
+            stack.enter_context(lock)
+        return stack
+
+    def get(self, tickers: List[str], start: pd.Timestamp) -> Dict[str, pd.DataFrame]:
+        with self._locked(tickers):
+            return self._get(tickers, start)
+
+    def _get(self, tickers: List[str], start: pd.Timestamp) -> Dict[str, pd.DataFrame]:
+        start = pd.Timestamp(start).normalize()
+        report = DownloadReport()
+        plans = {t: self.plan(t, start) for t in dict.fromkeys(tickers)}
+        result: Dict[str, pd.DataFrame] = {}
+        todo = {}
+        for t, (cached, fetch_from, covered) in plans.items():
+            if fetch_from is None:
+                self._count("disk_hits")
+                result[t] = cached
+            else:
+                todo[t] = fetch_from
+        try:
+            fresh, _ = self.engine.download(todo, report)
+            refetch = {}
+            for t in todo:
+                cached, _, covered = plans[t]
+                if t not in fresh:
+                    if cached is not None:
+                        result[t] = cached
+                    continue
+                merged = self.merge(cached, fresh[t])
+                if merged is None and cached is not None:
+                    # overlap klopt niet meer (split/dividend-correctie): volledige historie opnieuw ophalen
+                    refetch[t] = start
+                    continue
+                self._count("full_fetches" if cached is None else "delta_fetches")
+                if merged is not None:
+                    self.store(t, merged, covered)
+                    result[t] = merged
+            if refetch:
+                full, _ = self.engine.download(refetch, report)
+                for t, df in full.items():
+                    merged = self.merge(None, df)
+                    self._count("full_fetches")
+                    if merged is not None:
+                        self.store(t, merged, start)
+                        result[t] = merged
+        finally:
+            with self._lock:
+                self._save_index()
+        self.last_report = report
+        return {t: result[t].loc[start:] for t in tickers if t in result and not result[t].empty}
+
+_default_cache: Optional[PriceCache] = None
+
+def get_default_cache() -> PriceCache:
+    global _default_cache
+    if _default_cache is None:
+        root = os.getenv("PRICE_CACHE_DIR", "data/prices")
+        _default_cache = PriceCache(None if root.lower() in ("", "off", "none") else root)
+    return _default_cache
+
+def set_default_cache(cache: Optional[PriceCache]):
+    global _default_cache
+    _default_cache = cache
+
+def lookback_start(lookback_days: int) -> pd.Timestamp:
+    return pd.Timestamp(datetime.today() - timedelta(days=lookback_days*2)).normalize()
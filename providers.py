@@ -0,0 +1,113 @@
+import random, time
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or df.empty:
+        return pd.DataFrame()
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns=str.title)
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None) if getattr(df.index, "tz", None) else pd.DatetimeIndex(df.index)
+    df.index.name = "Date"
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna()
+
+class PriceProvider:
+    name = "base"
+    rate_limit: Optional[float] = None
+    batch_size = 1
+
+    def fetch(self, ticker: str, start: pd.Timestamp, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def fetch_many(self, tickers: List[str], start: pd.Timestamp, end: Optional[pd.Timestamp] = None,
+                   timeout: Optional[float] = None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        frames, errors = {}, {}
+        for t in tickers:
+            try:
+                frames[t] = self.fetch(t, start, end)
+            except Exception as e:
+                errors[t] = f"{type(e).__name__}: {e}"
+        return frames, errors
+
+class YahooProvider(PriceProvider):
+    name = "yahoo"
+    rate_limit = 2.0
+    batch_size = 25
+
+    def fetch(self, ticker: str, start: pd.Timestamp, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        frames, errors = self.fetch_many([ticker], start, end)
+        if ticker in errors:
+            raise RuntimeError(errors[ticker])
+        return frames.get(ticker, pd.DataFrame())
+
+    def fetch_many(self, tickers: List[str], start: pd.Timestamp, end: Optional[pd.Timestamp] = None,
+                   timeout: Optional[float] = None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        import yfinance as yf
+        df = yf.download(tickers, start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+                         end=None if end is None else pd.Timestamp(end).strftime("%Y-%m-%d"),
+                         progress=False, auto_adjust=True, group_by="ticker", threads=False,
+                         timeout=timeout or 10)
+        # yf.shared._ERRORS niet lezen: die globale lijst wordt door elke download gereset, ook door
+        # batches in andere threads. Een lege of volledig lege (NaN) kolom telt als fout voor die ticker.
+        frames, errors = {}, {}
+        for t in tickers:
+            sub = None
+            if df is not None and not df.empty:
+                if not isinstance(df.columns, pd.MultiIndex):
+                    sub = df
+                elif t in df.columns.get_level_values(0):
+                    sub = df[t]
+            sub = normalize_ohlcv(sub)
+            if sub.empty:
+                errors[t] = "geen data van Yahoo"
+            else:
+                frames[t] = sub
+        if not frames:
+            # recente yfinance-versies slikken netwerkfouten in; een volledig lege batch behandelen we als tijdelijk
+            raise RuntimeError("lege respons van Yahoo")
+        return frames, errors
+
+class StaticProvider(PriceProvider):
+    name = "static"
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], latency: float = 0.0, fail_rate: float = 0.0,
+                 fail_tickers: Tuple[str, ...] = (), batch_size: int = 25, seed: Optional[int] = None):
+        self.frames = {t: normalize_ohlcv(df) for t, df in frames.items()}
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_tickers = set(fail_tickers)
+        self.batch_size = batch_size
+        self._rng = random.Random(seed)
+        self.calls = []
+
+    def _slice(self, ticker: str, start: pd.Timestamp, end: Optional[pd.Timestamp]) -> pd.DataFrame:
+        df = self.frames.get(ticker)
+        if df is None:
+            return pd.DataFrame()
+        df = df.loc[pd.Timestamp(start):]
+        if end is not None:
+            df = df.loc[:pd.Timestamp(end) - pd.Timedelta(days=1)]
+        return df.copy()
+
+    def fetch(self, ticker: str, start: pd.Timestamp, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        frames, errors = self.fetch_many([ticker], start, end)
+        if ticker in errors:
+            raise RuntimeError(errors[ticker])
+        return frames.get(ticker, pd.DataFrame())
+
+    def fetch_many(self, tickers: List[str], start: pd.Timestamp, end: Optional[pd.Timestamp] = None,
+                   timeout: Optional[float] = None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        self.calls.append((list(tickers), pd.Timestamp(start), end))
+        if self.latency:
+            if timeout is not None and self.latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError(f"geen antwoord binnen {timeout}s")
+            time.sleep(self.latency)
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            raise ConnectionError("gesimuleerde providerfout")
+        frames = {t: self._slice(t, start, end) for t in tickers if t not in self.fail_tickers}
+        errors = {t: "gesimuleerde tickerfout" for t in tickers if t in self.fail_tickers}
+        return frames, errors
@@ -1,9 +1,23 @@
-import os, smtplib, ssl, requests
-from email.mime.text import MIMEText
+import os
 
 def make_report_md(rep: dict) -> str:
     lines = []
     lines.append(f"# Dagrapport • {rep.get('timestamp','')}")
+    errors = rep.get("errors", {})
+    if errors:
+        lines.append("\n## Waarschuwingen")
+        for stage, err in errors.items():
+            lines.append(f"- Onderdeel **{stage}** niet beschikbaar: {err}")
+    changes = rep.get("signal_changes")
+    if changes is not None:
+        lines.append("\n## Gewijzigde signalen")
+        if changes:
+            lines.append("| Ticker | Was | Nu | Close | Vorige run |")
+            lines.append("|---|---|---|---:|---|")
+            for c in changes:
+                lines.append(f"| {c['ticker']} | {c['from'] or 'nieuw'} | **{c['to']}** | {c['close']:.2f} | {c['since'] or '—'} |")
+        else:
+            lines.append("Geen wijzigingen sinds de vorige run.")
     sigs = rep.get("signals", {})
     if sigs:
         lines.append("\n## Signalen")
@@ -31,6 +45,9 @@ def make_report_md(rep: dict) -> str:
         lines.append("|---|---|---:|---:|")
         for row in sector:
             lines.append(f"| {row['sector']} | {row['tickers']} | {row['avg_price']:.2f} | {row['count']} |")
+    fs = rep.get("fetch_stats")
+    if fs:
+        lines.append(f"\n_Data: {fs['fetched']} tickers opgehaald, {fs['avoided']} dubbele downloads vermeden._")
     return "\n".join(lines)
 
 def send_slack(markdown: str, webhook_url: str = None, timeout: int = 10):
@@ -38,25 +55,19 @@ def send_slack(markdown: str, webhook_url: str = None, timeout: int = 10):
     if not url:
         return False, "SLACK_WEBHOOK_URL ontbreekt"
     try:
-        res = requests.post(url, json={"text": markdown}, timeout=timeout)
-        ok = 200 <= res.status_code < 300
-        return ok, res.text if not ok else "OK"
+        from .delivery import Dispatcher, Message, SlackSender
+        with Dispatcher({"slack": SlackSender(timeout=timeout)}) as d:
+            res = d.deliver([Message("slack", url, markdown)])[0]
+        return res["status"] != "failed", res["error"] or "OK"
     except Exception as e:
         return False, str(e)
 
 def send_email(subject: str, markdown: str, to_addr: str = None):
-    host = os.getenv("SMTP_HOST"); port = int(os.getenv("SMTP_PORT", "587"))
-    user = os.getenv("SMTP_USER"); pwd = os.getenv("SMTP_PASS")
+    from .delivery import Dispatcher, Message, SmtpSender
+    smtp = SmtpSender.from_env()
     to = to_addr or os.getenv("EMAIL_TO")
-    if not all([host, port, user, pwd, to]):
+    if not smtp or not all([smtp.user, smtp.password, to]):
         return False, "SMTP variabelen ontbreken (SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, EMAIL_TO)"
-    msg = MIMEText(markdown, "plain", "utf-8")
-    msg["Subject"] = subject; msg["From"] = user; msg["To"] = to
-    try:
-        with smtplib.SMTP(host, port) as s:
-            s.starttls(context=ssl.create_default_context())
-            s.login(user, pwd)
-            s.sendmail(user, [to], msg.as_string())
-        return True, "OK"
-    except Exception as e:
-        return False, str(e)
+    with Dispatcher({"email": smtp}) as d:
+        res = d.deliver([Message("email", to, markdown, subject=subject)])[0]
+    return res["status"] != "failed", res["error"] or "OK"
@@ -1,49 +1,79 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
-
-def _download(tickers: List[str], lookback_days: int = 400):
-    start = datetime.today() - timedelta(days=lookback_days*2)
-    out = {}
-    for t in tickers:
-        df = yf.download(t, start=start.strftime("%Y-%m-%d"), progress=False, auto_adjust=True)
-        if not df.empty:
-            out[t] = df.rename(columns=str.title).dropna()
-    return out
-
-def _factors(df: pd.DataFrame) -> pd.Series:
-    px = df["Close"]
-    ret_252 = px.pct_change(252).iloc[-1] if len(px) > 252 else None
-    ret_63  = px.pct_change(63).iloc[-1] if len(px) > 63 else None
-    vol20   = px.pct_change().rolling(20).std().iloc[-1]
-    high_52 = px.rolling(252).max().iloc[-1] if len(px) > 252 else px.max()
-    dist_h  = (px.iloc[-1] / high_52) - 1 if high_52 else None
-    return pd.Series({"mom_12m": ret_252, "mom_3m": ret_63, "vol_20d": vol20, "dist_52w_high": dist_h})
-
-def screen_universe(sectors: Dict[str, List[str]], top_n: int = 3) -> Dict[str, List[Tuple[str, float]]]:
-    all_tickers = sorted({t for ts in sectors.values() for t in ts})
-    data = _download(all_tickers, 400)
-    rows = []
-    for t, df in data.items():
-        if len(df) < 120: 
-            continue
-        fac = _factors(df)
-        rows.append({"ticker": t, **fac.to_dict()})
-    if not rows:
-        return {s: [] for s in sectors}
-    fac = pd.DataFrame(rows).dropna()
-    if fac.empty:
-        return {s: [] for s in sectors}
+from .data_sources import fetch_prices
+
+SCREEN_LOOKBACK = 400
+FACTOR_COLUMNS = ["mom_12m", "mom_3m", "vol_20d", "dist_52w_high"]
+TRAIL = 253
+MIN_HISTORY = 120
+
+def _download(tickers: List[str], lookback_days: int = SCREEN_LOOKBACK):
+    return fetch_prices(tickers, lookback_days=lookback_days)
+
+def _tail_matrix(data: Mapping[str, pd.DataFrame], tickers: List[str], dtype=np.float32) -> Tuple[np.ndarray, np.ndarray]:
+    mat = np.full((TRAIL, len(tickers)), np.nan, dtype=dtype)
+    lengths = np.zeros(len(tickers), dtype=np.int64)
+    for j, t in enumerate(tickers):
+        px = data[t]["Close"].to_numpy()
+        lengths[j] = len(px)
+        tail = px[-TRAIL:]
+        if len(tail):
+            mat[TRAIL - len(tail):, j] = tail
+    return mat, lengths
 
-    fac["r_mom12"] = fac["mom_12m"].rank(pct=True)
-    fac["r_mom3"]  = fac["mom_3m"].rank(pct=True)
-    fac["r_vol"]   = (-fac["vol_20d"]).rank(pct=True)
-    fac["r_dist"]  = (-fac["dist_52w_high"]).rank(pct=True)
-    fac["score"]   = fac[["r_mom12","r_mom3","r_vol","r_dist"]].mean(axis=1)
+def _factor_arrays(mat: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    px = mat.astype(np.float64)
+    last = px[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom_12m = np.where(lengths > 252, last / px[-253] - 1, np.nan)
+        mom_3m = np.where(lengths > 63, last / px[-64] - 1, np.nan)
+        rets = px[-20:] / px[-21:-1] - 1
+        vol_20d = np.where(lengths > 20, np.std(rets, axis=0, ddof=1), np.nan)
+        high = np.nanmax(px[-252:], axis=0)
+        dist = np.where(high != 0, last / high - 1, np.nan)
+    return np.column_stack([mom_12m, mom_3m, vol_20d, dist])
 
+def factor_table(data: Mapping[str, pd.DataFrame], tickers: Optional[List[str]] = None, dtype=np.float32) -> pd.DataFrame:
+    tickers = [t for t in (tickers if tickers is not None else data.keys()) if t in data and len(data[t]) >= MIN_HISTORY]
+    if not tickers:
+        return pd.DataFrame(columns=FACTOR_COLUMNS, dtype=float)
+    mat, lengths = _tail_matrix(data, tickers, dtype)
+    return pd.DataFrame(_factor_arrays(mat, lengths), index=pd.Index(tickers, name="ticker"), columns=FACTOR_COLUMNS)
+
+def stream_factor_table(tickers: List[str], chunk_size: int = 250, lookback_days: int = SCREEN_LOOKBACK,
+                        prices: Optional[Mapping[str, pd.DataFrame]] = None, dtype=np.float32) -> pd.DataFrame:
+    parts = []
+    for i in range(0, len(tickers), chunk_size):
+        block = tickers[i:i + chunk_size]
+        data = _download(block, lookback_days) if prices is None else prices
+        parts.append(factor_table(data, block, dtype))
+        del data
+    parts = [p for p in parts if not p.empty]
+    return pd.concat(parts) if parts else pd.DataFrame(columns=FACTOR_COLUMNS, dtype=float)
+
+def rank_factors(fac: pd.DataFrame, sectors: Dict[str, List[str]], top_n: int = 3) -> Dict[str, List[Tuple[str, float]]]:
+    fac = fac.dropna()
+    if fac.empty:
+        return {s: [] for s in sectors}
+    signed = fac[FACTOR_COLUMNS] * np.array([1.0, 1.0, -1.0, -1.0])
+    score = signed.rank(pct=True).to_numpy().mean(axis=1)
+    names = fac.index.to_numpy()
+    pos = {t: i for i, t in enumerate(names)}
     res = {}
     for sec, ts in sectors.items():
-        sdf = fac[fac["ticker"].isin(ts)].sort_values("score", ascending=False)
-        res[sec] = list(zip(sdf["ticker"].head(top_n), sdf["score"].head(top_n)))
+        idx = np.array([pos[t] for t in dict.fromkeys(ts) if t in pos], dtype=np.int64)
+        idx = np.sort(idx)
+        order = idx[np.argsort(-score[idx], kind="stable")][:top_n]
+        res[sec] = [(names[i], score[i]) for i in order]
     return res
+
+def screen_universe(sectors: Dict[str, List[str]], top_n: int = 3, prices: Optional[Mapping[str, pd.DataFrame]] = None,
+                    chunk_size: Optional[int] = None, dtype=np.float32) -> Dict[str, List[Tuple[str, float]]]:
+    all_tickers = sorted({t for ts in sectors.values() for t in ts})
+    if chunk_size:
+        fac = stream_factor_table(all_tickers, chunk_size, prices=prices, dtype=dtype)
+    else:
+        data = _download(all_tickers, SCREEN_LOOKBACK) if prices is None else prices
+        fac = factor_table(data, all_tickers, dtype)
+    return rank_factors(fac, sectors, top_n)
@@ -0,0 +1,212 @@
+import json, logging, threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+import yaml
+from .agent import run_day
+from .backtest import backtest_ticker, backtest_portfolio
+from .data_sources import fetch_prices
+from .incremental import LiveSignals
+from .memo import LRUCache, file_hash, make_key
+from .price_cache import get_default_cache
+from .report import make_report_md
+
+log = logging.getLogger(__name__)
+
+SIGNAL_PARAMS = {"ma_short": int, "ma_long": int, "rsi_period": int, "rsi_buy": float, "rsi_sell": float}
+
+def to_json(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Series):
+        return series_payload(obj)
+    raise TypeError(f"{type(obj).__name__} is niet JSON-serialiseerbaar")
+
+def series_payload(s: pd.Series) -> Dict[str, float]:
+    return {pd.Timestamp(k).strftime("%Y-%m-%d"): float(v) for k, v in s.items()}
+
+def _backtest_payload(res: Dict[str, Any]) -> Dict[str, Any]:
+    return {"metrics": res["metrics"], "equity": series_payload(res["equity"]), "returns": series_payload(res["returns"])}
+
+class AgentService:
+    def __init__(self, config_path: str = "config.yaml", refresh_minutes: float = 15.0, ttl: Optional[float] = None,
+                 cache: Optional[LRUCache] = None, max_workers: int = 4):
+        self.config_path = config_path
+        self.refresh_s = refresh_minutes * 60
+        self.ttl = ttl if ttl is not None else self.refresh_s
+        self.cache = cache or LRUCache()
+        self.max_workers = max_workers
+        self.version = 0
+        self.last_refresh: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._live: Optional[LiveSignals] = None
+        self._live_key: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # prijzen blijven in het geheugen; elke refresh haalt alleen de delta op. Deze cache deelt index en
+        # frames met de standaardcache, maar wordt overal expliciet meegegeven; de standaardcache blijft ongemoeid
+        self.prices = get_default_cache().with_max_age(refresh_minutes / 60)
+
+    def config(self) -> dict:
+        return yaml.safe_load(Path(self.config_path).read_text(encoding="utf-8"))
+
+    def _compute_report(self) -> Dict[str, Any]:
+        with self._lock:
+            cfg = self.config()
+            key = make_key(file_hash(self.config_path))
+            if self._live is None or key != self._live_key:
+                self._live, self._live_key = LiveSignals(cfg["signals"]), key
+            rep = run_day(self.config_path, self.max_workers, live=self._live, cache=self.prices)
+            self.version += 1
+            self.last_refresh = datetime.now()
+            return rep
+
+    def report(self) -> Dict[str, Any]:
+        return self.cache.get_or_compute("report", self._compute_report, ttl=self.ttl)
+
+    def refresh(self) -> Dict[str, Any]:
+        self.cache.discard("report")
+        try:
+            rep = self.report()
+            self.last_error = None
+            return rep
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+
+    def backtest(self, ticker: str, params: Dict[str, Any], cost_bps: float = 5) -> Dict[str, Any]:
+        cfg = self.config()
+        params = {**cfg["signals"], **params}
+        lookback = cfg["data"]["lookback_days"]
+
+        def compute():
+            prices = fetch_prices([ticker], lookback_days=lookback, cache=self.prices)
+            if ticker not in prices:
+                raise KeyError(f"geen data voor {ticker}")
+            return _backtest_payload(backtest_ticker(prices[ticker], params, cost_bps=cost_bps))
+        return self.cache.get_or_compute(make_key("bt", ticker, params, cost_bps, lookback, self.version), compute, ttl=self.ttl)
+
+    def backtest_portfolio(self, weights: Optional[Dict[str, float]] = None, cost_bps: float = 5) -> Dict[str, Any]:
+        cfg = self.config()
+        tickers, lookback = cfg["portfolio"]["tickers"], cfg["data"]["lookback_days"]
+        weights = weights or cfg["portfolio"].get("weights")
+
+        def compute():
+            prices = fetch_prices(tickers, lookback_days=lookback, cache=self.prices)
+            return _backtest_payload(backtest_portfolio(prices, cfg["signals"], weights=weights, cost_bps=cost_bps))
+        return self.cache.get_or_compute(make_key("bt_port", file_hash(self.config_path), weights, cost_bps, self.version),
+                                         compute, ttl=self.ttl)
+
+    def health(self) -> Dict[str, Any]:
+        return {"status": "ok" if self.last_error is None else "degraded", "version": self.version,
+                "last_refresh": self.last_refresh, "last_error": self.last_error, "cache": self.cache.stats(),
+                "prices": self.prices.stats}
+
+    def route(self, method: str, parts: List[str], query: Dict[str, str]) -> Tuple[Any, str]:
+        head, rest = (parts[0] if parts else ""), parts[1:]
+        if method == "POST" and head == "refresh":
+            self.refresh()
+            return {"version": self.version, "last_refresh": self.last_refresh}, "application/json"
+        if method != "GET":
+            raise ValueError(f"{method} niet ondersteund")
+        if head in ("", "health"):
+            return self.health(), "application/json"
+        if head == "report":
+            rep = self.report()
+            return (make_report_md(rep), "text/markdown; charset=utf-8") if query.get("format") == "md" else (rep, "application/json")
+        if head in ("signals", "forecast"):
+            data = self.report()["signals" if head == "signals" else "forecast_5d"]
+            if rest:
+                if rest[0] not in data:
+                    raise KeyError(f"onbekende ticker {rest[0]}")
+                return data[rest[0]], "application/json"
+            return data, "application/json"
+        if head == "backtest":
+            cost = float(query.get("cost_bps", 5))
+            if rest == ["portfolio"]:
+                weights = None
+                if query.get("weights"):
+                    weights = {t.strip(): float(v) for t, v in (p.split("=") for p in query["weights"].split(",") if p.strip())}
+                return self.backtest_portfolio(weights, cost), "application/json"
+            if "ticker" not in query:
+                raise ValueError("parameter ticker ontbreekt")
+            params = {k: cast(query[k]) for k, cast in SIGNAL_PARAMS.items() if k in query}
+            return self.backtest(query["ticker"], params, cost), "application/json"
+        raise KeyError(f"onbekend pad /{'/'.join(parts)}")
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            log.exception("Refresh mislukt")
+
+    def start_scheduler(self):
+        def loop():
+            while not self._stop.wait(self.refresh_s):
+                self._safe_refresh()
+        threading.Thread(target=loop, name="agent-refresh", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+def make_handler(service: AgentService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, payload: Any, content_type: str = "application/json"):
+            body = payload if isinstance(payload, str) else json.dumps(payload, default=to_json)
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self, method: str):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                payload, ctype = service.route(method, [p for p in url.path.split("/") if p], query)
+                self._send(200, payload, ctype)
+            except KeyError as e:
+                self._send(404, {"error": str(e.args[0]) if e.args else "niet gevonden"})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                log.exception("Fout bij %s %s", method, self.path)
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def log_message(self, fmt, *args):
+            log.debug("%s - %s", self.address_string(), fmt % args)
+
+    return Handler
+
+def serve(config_path: str = "config.yaml", host: str = "127.0.0.1", port: int = 8765, refresh_minutes: float = 15.0):
+    service = AgentService(config_path, refresh_minutes)
+    # eerste rapport op de achtergrond, zodat de server direct bereikbaar is (aanvragen wachten erop)
+    threading.Thread(target=service._safe_refresh, name="agent-warmup", daemon=True).start()
+    service.start_scheduler()
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    httpd.daemon_threads = True
+    print(f"Agent-service op http://{host}:{httpd.server_address[1]} (refresh elke {refresh_minutes:g} min)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        httpd.server_close()
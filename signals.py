@@ -1,7 +1,13 @@
 from typing import Dict
+import numpy as np
 import pandas as pd
 from ta.trend import SMAIndicator, MACD
 from ta.momentum import RSIIndicator
+from .panel import PricePanel
+
+SIGNAL_CODES = {"BUY": 1.0, "SELL": -1.0, "HOLD": 0.0}
+SIGNAL_LABELS = np.array(["SELL", "HOLD", "BUY"])
+IND_COLUMNS = ["SMA_S", "SMA_L", "RSI", "MACD", "MACD_SIG"]
 
 def indicators(df: pd.DataFrame, ma_short=20, ma_long=50, rsi_period=14) -> pd.DataFrame:
     out = df.copy()
@@ -21,20 +27,53 @@ def signal_from_row(row, rsi_buy=35, rsi_sell=65):
         sig = "SELL"
     return sig
 
-def generate_signals(prices: Dict[str, pd.DataFrame], params: Dict) -> Dict[str, Dict]:
-    out = {}
+def signal_codes(sma_s, sma_l, rsi, macd, macd_sig, rsi_buy=35, rsi_sell=65) -> np.ndarray:
+    sma_s, sma_l, rsi, macd, macd_sig = (np.asarray(a, dtype=float) for a in (sma_s, sma_l, rsi, macd, macd_sig))
+    buy = (sma_s > sma_l) & (rsi < rsi_sell) & (macd > macd_sig)
+    sell = (sma_s < sma_l) & (rsi > rsi_buy) & (macd < macd_sig)
+    return np.where(sell, -1.0, np.where(buy, 1.0, 0.0))
+
+def signal_labels(codes) -> np.ndarray:
+    return SIGNAL_LABELS[np.asarray(codes, dtype=int) + 1]
+
+def signal_series(ind: pd.DataFrame, rsi_buy=35, rsi_sell=65) -> pd.Series:
+    codes = signal_codes(*(ind[c].to_numpy() for c in IND_COLUMNS), rsi_buy, rsi_sell)
+    return pd.Series(codes, index=ind.index)
+
+def signal_matrix(inds: Dict[str, pd.DataFrame], rsi_buy=35, rsi_sell=65) -> pd.DataFrame:
+    if not inds:
+        return pd.DataFrame(dtype=float)
+    # één gedeelde datumindex voor alle kolommen i.p.v. een concat per kolom
+    panel = PricePanel.from_dict(inds, fields=IND_COLUMNS)
+    cols = [panel.field(c) for c in IND_COLUMNS]
+    valid = panel.valid.T & np.logical_and.reduce([~np.isnan(a) for a in cols])
+    codes = signal_codes(*cols, rsi_buy, rsi_sell)
+    return pd.DataFrame(np.where(valid, codes, np.nan), index=panel.dates, columns=panel.tickers)
+
+def generate_signals(prices: Dict[str, pd.DataFrame], params: Dict, live=None) -> Dict[str, Dict]:
+    if live is not None:
+        for t, df in prices.items():
+            live.update_frame(t, df)
+        return live.snapshot(list(prices.keys()))
+    last = {}
     for t, df in prices.items():
         ind = indicators(df, params["ma_short"], params["ma_long"], params["rsi_period"])
         if ind.empty: continue
-        last = ind.iloc[-1]
-        sig = signal_from_row(last, params["rsi_buy"], params["rsi_sell"])
+        last[t] = ind.iloc[-1]
+    if not last:
+        return {}
+    rows = np.array([[r[c] for c in IND_COLUMNS] for r in last.values()], dtype=float)
+    sigs = signal_labels(signal_codes(*rows.T, params["rsi_buy"], params["rsi_sell"]))
+    out = {}
+    for t, sig in zip(last, sigs):
+        r = last[t]
         out[t] = {
-            "signal": sig,
-            "close": float(last["Close"]),
-            "sma_s": float(last["SMA_S"]),
-            "sma_l": float(last["SMA_L"]),
-            "rsi": float(last["RSI"]),
-            "macd": float(last["MACD"]),
-            "macd_sig": float(last["MACD_SIG"]),
+            "signal": str(sig),
+            "close": float(r["Close"]),
+            "sma_s": float(r["SMA_S"]),
+            "sma_l": float(r["SMA_L"]),
+            "rsi": float(r["RSI"]),
+            "macd": float(r["MACD"]),
+            "macd_sig": float(r["MACD_SIG"]),
         }
     return out
@@ -0,0 +1,113 @@
+from typing import Any, Dict, Optional
+import numpy as np
+import pandas as pd
+from .backtest import _metrics
+from .signals import indicators, signal_matrix
+
+REBALANCE = {"D": "D", "W": "W", "M": "M", "Q": "Q", "Y": "Y", "none": None}
+
+def _aligned(prices: Dict[str, pd.DataFrame], params: Dict[str, Any]):
+    inds = {t: indicators(df, params["ma_short"], params["ma_long"], params["rsi_period"]).dropna() for t, df in prices.items()}
+    inds = {t: ind for t, ind in inds.items() if not ind.empty}
+    codes = signal_matrix(inds, params["rsi_buy"], params["rsi_sell"])
+    if codes.empty:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty((0, 0))
+    tickers = list(codes.columns)
+    close = np.column_stack([prices[t]["Close"].reindex(codes.index, method="ffill").to_numpy(dtype=float) for t in tickers])
+    # feestdag van één beurs: laatste signaal aanhouden, net als de per-ticker backtest
+    return codes.index, tickers, close, codes.ffill().fillna(0.0).to_numpy()
+
+def _rebalance_closes(dates: pd.DatetimeIndex, rebalance: Optional[str]) -> np.ndarray:
+    rb = np.zeros(len(dates), dtype=bool)
+    freq = REBALANCE[rebalance or "none"]
+    if freq == "D":
+        rb[:-1] = True
+    elif freq:
+        p = dates.to_period(freq)
+        rb[:-1] = p[:-1] != p[1:]
+    return rb
+
+def _take(a: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    return np.take_along_axis(a, np.clip(idx, 0, None), axis=0)
+
+def simulate_portfolio(prices: Dict[str, pd.DataFrame], params: Dict[str, Any], weights: Dict[str, float] = None,
+                       risk: Optional[Dict[str, float]] = None, rebalance: Optional[str] = "M", cost_bps: float = 5) -> Dict[str, Any]:
+    dates, tickers, C, codes = _aligned(prices, params)
+    empty = {"metrics": {}, "equity": pd.Series(dtype=float), "returns": pd.Series(dtype=float)}
+    if not tickers or len(dates) < 2:
+        return empty
+    risk = risk or {}
+    T, N = C.shape
+    rows = np.arange(T)[:, None]
+    weights = weights or {t: 1 / len(prices) for t in prices}
+    b = np.array([weights.get(t, 0.0) for t in tickers], dtype=float)
+    if risk.get("max_position_pct"):
+        b = np.minimum(b, risk["max_position_pct"])
+
+    # gehouden richting op dag t = signaal van de slotkoers ervoor
+    h = np.zeros_like(codes)
+    h[1:] = codes[:-1]
+    change = np.ones((T, N), dtype=bool)
+    change[1:] = h[1:] != h[:-1]
+    seg_start = np.maximum.accumulate(np.where(change, rows, 0), axis=0)
+    entry = seg_start - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        move = h * (C / _take(C, entry) - 1)
+    sl, tp = risk.get("stop_loss_pct"), risk.get("take_profit_pct")
+    hit_sl = (h != 0) & (move <= -sl) if sl else np.zeros((T, N), dtype=bool)
+    hit_tp = (h != 0) & (move >= tp) if tp else np.zeros((T, N), dtype=bool)
+    # na een stop plat blijven tot het signaal wijzigt
+    cs = np.zeros((T + 1, N), dtype=np.int64)
+    cs[1:] = np.cumsum(hit_sl | hit_tp, axis=0)
+    stopped = (cs[:-1] - np.take_along_axis(cs, seg_start, axis=0)) > 0
+    held = np.where(stopped, 0.0, h)
+
+    rb = _rebalance_closes(dates, rebalance)
+    pid = np.concatenate([[0], np.cumsum(rb)[:-1]])
+    last_rb = np.full(T, -1)
+    last_rb[1:] = np.maximum.accumulate(np.where(rb, np.arange(T), -1))[:-1]
+    ref = np.maximum(entry, last_rb[:, None])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        C_ref = _take(C, ref)
+        x = np.where(held != 0, b * held * C / C_ref, 0.0)
+        pnl = np.zeros((T, N))
+        pnl[1:] = np.where(held[1:] != 0, b * held[1:] * (C[1:] - C[:-1]) / C_ref[1:], 0.0)
+        y = x.copy()
+        y[:-1] = np.where(held[1:] != 0, b * held[1:] * C[:-1] / C_ref[1:], 0.0)
+    cost = cost_bps / 10000.0
+    traded = np.abs(y - x)
+    intra = np.where(rb[:, None], 0.0, traded).sum(axis=1)
+    dG = pnl.sum(axis=1) - cost * intra
+
+    # alleen de rebalance-kosten hangen van de vermogensstand af: één stap per periode
+    bounds = np.flatnonzero(rb)
+    period_sum = np.bincount(pid, weights=dG, minlength=len(bounds) + 1)
+    start = np.ones(len(bounds) + 1)
+    G_end = np.empty(len(bounds))
+    rb_traded = np.empty(len(bounds))
+    for k, t in enumerate(bounds):
+        G_end[k] = start[k] + period_sum[k]
+        rb_traded[k] = np.abs(y[t] - x[t] / G_end[k]).sum()
+        start[k + 1] = 1 - cost * rb_traded[k]
+    csum = np.cumsum(dG)
+    offset = np.concatenate([[0.0], csum[bounds]])
+    G = start[pid] + csum - offset[pid]
+    G_prev = np.empty(T)
+    G_prev[0] = 1.0
+    G_prev[1:] = np.where(pid[1:] == pid[:-1], G[:-1], start[pid[1:]])
+    factor = np.ones(T)
+    factor[bounds] = start[1:]
+    ret = G / G_prev * factor - 1
+
+    turnover = intra / G
+    turnover[bounds] = rb_traded
+    returns = pd.Series(ret, index=dates)
+    metrics = _metrics(returns)
+    years = T / 252
+    metrics.update({"turnover": float(turnover.sum() / 2 / years), "trades": int(np.count_nonzero(traded > 1e-12)),
+                    "stop_losses": int((hit_sl & ~stopped & (held != 0)).sum()),
+                    "take_profits": int((hit_tp & ~stopped & (held != 0)).sum()),
+                    "costs": float(cost * turnover.sum())})
+    return {"metrics": metrics, "equity": (1 + returns).cumprod(), "returns": returns,
+            "weights": pd.DataFrame(x / G[:, None], index=dates, columns=tickers),
+            "turnover": pd.Series(turnover, index=dates)}
@@ -1,18 +1,22 @@
 import os, sys
 from pathlib import Path
 ROOT = Path(__file__).resolve().parent
-SRC = ROOT / "src"
-if str(SRC) not in sys.path:
-    sys.path.insert(0, str(SRC))
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
 import streamlit as st
 import pandas as pd
 import yaml
 
-from agent import run_day
-from backtest import backtest_ticker, backtest_portfolio
-from data_sources import fetch_prices
-from report import make_report_md, send_slack, send_email
+from src.agent import run_day
+from src.backtest import backtest_ticker, backtest_portfolio
+from src.bootstrap import bootstrap_intervals
+from src.client import ServiceClient, equity_series, service_url
+from src.data_sources import fetch_prices
+from src.memo import LRUCache, make_key, file_hash, bar_dates
+from src.report import make_report_md, send_slack, send_email
+from src.scanner import SCREEN_LOOKBACK
+from src.signals import indicators
 
 st.set_page_config(page_title="Beleggings AI Agent", layout="wide")
 st.title("Beleggings AI Agent (No‑Code)")
@@ -20,9 +24,58 @@ st.title("Beleggings AI Agent (No‑Code)")
 cfg_path = "config.yaml"
 st.caption("Pas tickers/sectoren aan via de GitHub web‑editor.")
 
+@st.cache_resource
+def shared_cache() -> LRUCache:
+    return LRUCache(max_entries=int(os.getenv("APP_CACHE_ENTRIES", "256")),
+                    max_bytes=int(os.getenv("APP_CACHE_MB", "512")) * 1024 * 1024)
+
+cache = shared_cache()
+PRICE_TTL = float(os.getenv("APP_PRICE_TTL_MIN", "15")) * 60  # daarna vraagt de app de PriceCache opnieuw
+SERVICE = service_url()
+client = ServiceClient(SERVICE) if SERVICE else None
+
+def remote_backtest(payload):
+    return {"metrics": payload["metrics"], "equity": equity_series(payload["equity"]), "returns": equity_series(payload["returns"])}
+
+def cached_prices(tickers, lookback_days=365):
+    key = make_key("prices", sorted(tickers), lookback_days)
+    return cache.get_or_compute(key, lambda: fetch_prices(list(tickers), lookback_days=lookback_days), ttl=PRICE_TTL)
+
+def cached_indicators(ticker, df, ma_s, ma_l, rsi_p, lookback_days=365):
+    key = make_key("ind", ticker, ma_s, ma_l, rsi_p, lookback_days, bar_dates({ticker: df}))
+    return cache.get_or_compute(key, lambda: indicators(df, ma_s, ma_l, rsi_p).dropna())
+
+def bootstrap_panel(key_parts, returns, n_paths):
+    if not n_paths or returns is None or len(returns) < 2:
+        return
+    ci = cache.get_or_compute(make_key("boot", *key_parts, n_paths),
+                              lambda: bootstrap_intervals(returns, n_paths=n_paths, seed=0))
+    st.subheader("Onzekerheid (bootstrap, 5–95%)")
+    st.dataframe(ci.round(4))
+
+with st.sidebar:
+    st.subheader("Cache")
+    cache_stats = st.empty()
+    st.caption(f"config {file_hash(cfg_path)}")
+    if client:
+        st.caption(f"Service: {SERVICE}")
+    if st.button("Cache legen"):
+        cache.invalidate()
+
 if st.button("Run nu"):
-    rep = run_day(cfg_path)
-    st.session_state["report"] = rep
+    rep = None
+    if client:
+        try:
+            rep = client.report()
+        except RuntimeError as e:
+            st.error(str(e))
+    else:
+        run_cfg = yaml.safe_load(Path(cfg_path).read_text(encoding="utf-8"))
+        needed = {*run_cfg["portfolio"]["tickers"], *(t for ts in run_cfg["sectors"].values() for t in ts)}
+        bars = bar_dates(cached_prices(tuple(sorted(needed)), max(run_cfg["data"]["lookback_days"], SCREEN_LOOKBACK)))
+        rep = cache.get_or_compute(make_key("run_day", file_hash(cfg_path), bars), lambda: run_day(cfg_path))
+    if rep:
+        st.session_state["report"] = rep
 
 rep = st.session_state.get("report")
 if rep:
@@ -33,6 +86,8 @@ if rep:
         st.subheader("Tickers"); st.write(", ".join(sorted(rep["last_prices"].keys())))
     with c3:
         st.subheader("Risico"); st.json(rep["risk"])
+    for stage, err in rep.get("errors", {}).items():
+        st.warning(f"{stage}: {err}")
 
     st.subheader("Sectorrapport"); st.dataframe(pd.DataFrame(rep["sector_report"]))
     st.subheader("Signalen"); st.dataframe(pd.DataFrame(rep["signals"]).T)
@@ -71,18 +126,31 @@ rsi_p = st.number_input("RSI periode", 5, 30, 14)
 rsi_buy = st.number_input("RSI koop drempel", 5, 60, 35)
 rsi_sell = st.number_input("RSI verkoop drempel", 40, 95, 65)
 cost_bps = st.number_input("Transactiekosten (bps)", 0, 50, 5)
+boot_n = st.number_input("Bootstrap-paden (0 = uit)", 0, 20000, 2000, step=500, key="boot_ticker")
 
 if st.button("Backtest draaien"):
-    prices = fetch_prices([ticker])
-    if ticker in prices:
-        res = backtest_ticker(prices[ticker], {
-            "ma_short": ma_s, "ma_long": ma_l, "rsi_period": rsi_p, "rsi_buy": rsi_buy, "rsi_sell": rsi_sell
-        }, cost_bps=cost_bps)
+    params = {"ma_short": ma_s, "ma_long": ma_l, "rsi_period": rsi_p, "rsi_buy": rsi_buy, "rsi_sell": rsi_sell}
+    res, error = None, None
+    if client:
+        # fouten van de service tonen, niet verbergen achter "Geen data"
+        try:
+            res = remote_backtest(client.backtest(ticker, params, cost_bps))
+        except RuntimeError as e:
+            error = str(e)
+    else:
+        prices = cached_prices((ticker,))
+        if ticker in prices:
+            ind = cached_indicators(ticker, prices[ticker], ma_s, ma_l, rsi_p)
+            res = cache.get_or_compute(make_key("bt", ticker, params, cost_bps, bar_dates({ticker: prices[ticker]})),
+                                       lambda: backtest_ticker(prices[ticker], params, cost_bps=cost_bps, ind=ind))
+    if res:
         st.subheader("Metrics")
         st.json({k: (round(v,4) if isinstance(v, float) else v) for k, v in res["metrics"].items()})
         st.subheader("Equity curve"); st.line_chart(res["equity"])
+        bootstrap_panel(("bt", ticker, params, cost_bps, res["returns"].index[-1] if len(res["returns"]) else None),
+                        res["returns"], boot_n)
     else:
-        st.error("Geen data voor deze ticker.")
+        st.error(error or "Geen data voor deze ticker.")
 
 st.markdown("---")
 st.header("Portfolio Backtest")
@@ -92,6 +160,7 @@ if Path(cfg_path).exists():
     weights = cfg["portfolio"].get("weights")
     st.write("Tickers:", ", ".join(tickers))
     custom_w = st.text_input("Gewichten (bijv. ASML.AS=0.3,AAPL=0.2,...). Leeg = equal weight.", value="")
+    boot_port = st.number_input("Bootstrap-paden (0 = uit)", 0, 20000, 2000, step=500, key="boot_port")
     def parse_w(s):
         if not s: return None
         parts = [p.strip() for p in s.split(",") if p.strip()]
@@ -102,9 +171,23 @@ if Path(cfg_path).exists():
         if abs(tot-1.0) > 1e-6: w = {k: v/tot for k, v in w.items()}
         return w
     if st.button("Portfolio backtest draaien"):
-        prices = fetch_prices(tickers, lookback_days=cfg["data"]["lookback_days"])
-        res = backtest_portfolio(prices, cfg["signals"], weights=parse_w(custom_w) or weights, cost_bps=5)
-        st.subheader("Metrics"); st.json({k: (round(v,4) if isinstance(v, float) else v) for k, v in res["metrics"].items()})
-        st.subheader("Equity curve (portfolio)"); st.line_chart(res["equity"])
+        w = parse_w(custom_w) or weights
+        res = None
+        if client:
+            try:
+                res = remote_backtest(client.backtest_portfolio(w, 5))
+            except RuntimeError as e:
+                st.error(str(e))
+        else:
+            prices = cached_prices(tuple(tickers), cfg["data"]["lookback_days"])
+            res = cache.get_or_compute(make_key("bt_port", file_hash(cfg_path), w, 5, bar_dates(prices)),
+                                       lambda: backtest_portfolio(prices, cfg["signals"], weights=w, cost_bps=5))
+        if res:
+            st.subheader("Metrics"); st.json({k: (round(v,4) if isinstance(v, float) else v) for k, v in res["metrics"].items()})
+            st.subheader("Equity curve (portfolio)"); st.line_chart(res["equity"])
+            bootstrap_panel(("bt_port", file_hash(cfg_path), w, 5, res["returns"].index[-1] if len(res["returns"]) else None),
+                            res["returns"], boot_port)
 else:
     st.info("config.yaml niet gevonden.")
+
+cache_stats.json(cache.stats())
@@ -0,0 +1,64 @@
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .providers import PriceProvider
+
+def _calendar(end: pd.Timestamp, years: float, seed: int, exchange: str) -> pd.DatetimeIndex:
+    days = pd.bdate_range(end=end, periods=int(round(years * 252 * 1.05)) + 10)
+    rng = np.random.default_rng(zlib.crc32(f"{seed}:{exchange}".encode()))
+    holidays = rng.random(len(days)) < 9 / 261
+    return days[~holidays][-int(round(years * 252)):]
+
+def synthetic_ohlcv(ticker: str, years: float = 1.0, seed: int = 0, end: Optional[pd.Timestamp] = None,
+                    gap_rate: float = 0.005) -> pd.DataFrame:
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    exchange = ticker.rsplit(".", 1)[1] if "." in ticker else "US"
+    idx = _calendar(end, years, seed, exchange)
+    rng = np.random.default_rng(zlib.crc32(f"{seed}:{ticker}".encode()))
+    n = len(idx)
+    mu, sigma = rng.normal(0.08, 0.1), rng.uniform(0.15, 0.5)
+    r = rng.normal((mu - sigma ** 2 / 2) / 252, sigma / np.sqrt(252), n)
+    close = rng.uniform(10, 500) * np.exp(np.cumsum(r))
+    open_ = close * np.exp(rng.normal(0, sigma / np.sqrt(252) / 3, n))
+    wick = np.abs(rng.normal(0, sigma / np.sqrt(252) / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(13, 0.6, n).round()
+    df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                      index=pd.DatetimeIndex(idx, name="Date"))
+    return df[rng.random(n) >= gap_rate]
+
+def synthetic_universe(n_tickers: int, years: float = 1.0, seed: int = 0, end: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+    return {t: synthetic_ohlcv(t, years, seed, end) for t in synthetic_tickers(n_tickers)}
+
+def synthetic_tickers(n: int) -> List[str]:
+    return [f"SYN{i:04d}.AS" if i % 3 == 0 else f"SYN{i:04d}" for i in range(n)]
+
+def synthetic_sectors(tickers: List[str], n_sectors: int = 11) -> Dict[str, List[str]]:
+    return {f"Sector{s:02d}": tickers[s::n_sectors] for s in range(min(n_sectors, len(tickers)))}
+
+class SyntheticProvider(PriceProvider):
+    name = "synthetic"
+    batch_size = 100
+
+    def __init__(self, years: float = 25.0, seed: int = 0, end: Optional[pd.Timestamp] = None):
+        self.years = years
+        self.seed = seed
+        self.end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def fetch(self, ticker: str, start: pd.Timestamp, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        if ticker not in self._frames:
+            self._frames[ticker] = synthetic_ohlcv(ticker, self.years, self.seed, self.end)
+        df = self._frames[ticker].loc[pd.Timestamp(start):]
+        if end is not None:
+            df = df.loc[:pd.Timestamp(end) - pd.Timedelta(days=1)]
+        return df.copy()
+
+def use_synthetic_prices(years: float = 25.0, seed: int = 0, end: Optional[pd.Timestamp] = None):
+    # vervangt Yahoo in fetch_prices en scanner._download door een in-memory cache met synthetische data
+    from .price_cache import PriceCache, set_default_cache
+    cache = PriceCache(None, SyntheticProvider(years, seed, end))
+    set_default_cache(cache)
+    return cache
@@ -0,0 +1,10 @@
+import importlib.util, sys
+from pathlib import Path
+
+# de repo is zelf het pakket (README: python -m src.cli); importeer het als 'src', ongeacht de mapnaam
+ROOT = Path(__file__).resolve().parents[1]
+if "src" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("src", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["src"] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+import yaml
+from src import agent
+from src.agent import run_batch, run_day
+from src.history import HistoryStore
+from src.price_cache import set_default_cache
+from src.synthetic import use_synthetic_prices
+
+CFG = {
+    "portfolio": {"tickers": ["ASML.AS", "AAPL", "MSFT", "NVDA"], "weights": None},
+    "sectors": {"Tech": ["ASML.AS", "AAPL", "MSFT", "NVDA"], "Consumer": ["AD.AS"]},
+    "risk": {"max_position_pct": 0.2, "stop_loss_pct": 0.1, "take_profit_pct": 0.2},
+    "signals": {"ma_short": 20, "ma_long": 50, "rsi_period": 14, "rsi_buy": 35, "rsi_sell": 65},
+    "data": {"lookback_days": 365},
+}
+
+@pytest.fixture(autouse=True)
+def synthetic_prices():
+    use_synthetic_prices(years=3, seed=2)
+    yield
+    set_default_cache(None)
+
+def write(path, **changes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.safe_dump({**CFG, **changes}), encoding="utf-8")
+    return str(path)
+
+COMPARED = ("last_prices", "signals", "forecast_5d", "sector_report", "opportunities")
+
+def test_batch_matches_run_day(tmp_path):
+    a = write(tmp_path / "a.yaml")
+    b = write(tmp_path / "b.yaml", signals={**CFG["signals"], "ma_short": 10}, data={"lookback_days": 200})
+    reports, summary = run_batch([a, b])
+    assert summary["configs"] == 2
+    for name, path in (("a", a), ("b", b)):
+        single = run_day(path)
+        for k in COMPARED:
+            assert reports[name][k] == single[k], k
+
+def test_batch_rejects_duplicate_names(tmp_path):
+    a = write(tmp_path / "one" / "x.yaml")
+    b = write(tmp_path / "two" / "x.yml")
+    with pytest.raises(ValueError, match="x"):
+        run_batch([a, b])
+
+def test_batch_deduplicates_the_same_file(tmp_path):
+    a = write(tmp_path / "a.yaml")
+    reports, summary = run_batch([a, str(tmp_path / "." / "a.yaml")])
+    assert list(reports) == ["a"] and summary["configs"] == 1
+
+def test_history_compares_against_the_previous_day(tmp_path):
+    path = write(tmp_path / "c.yaml", history={"dir": str(tmp_path / "history")})
+    first = run_day(path)
+    assert {c["ticker"] for c in first["signal_changes"]} == set(first["signals"])
+    # gisteren stond alles op een ander signaal
+    yesterday = pd.Timestamp(first["timestamp"][:10]) - pd.Timedelta(days=1)
+    flipped = {t: {**s, "signal": "XX"} for t, s in first["signals"].items()}
+    HistoryStore(str(tmp_path / "history")).append({"signals": flipped}, yesterday)
+    # ook een herhaalde run op dezelfde dag vergelijkt met gisteren, niet met de eerdere run van vandaag
+    for _ in range(2):
+        again = run_day(path)
+        assert {c["ticker"]: c["from"] for c in again["signal_changes"]} == {t: "XX" for t in first["signals"]}
+
+def test_history_is_recorded_when_the_screener_fails(tmp_path, monkeypatch):
+    def boom(*a, **k):
+        raise RuntimeError("screener kapot")
+    monkeypatch.setattr(agent, "screen_universe", boom)
+    path = write(tmp_path / "c.yaml", history={"dir": str(tmp_path / "history")})
+    rep = run_day(path)
+    assert "opportunities" in rep["errors"] and "signal_changes" not in rep["errors"]
+    assert rep["signal_changes"]
+    assert set(HistoryStore(str(tmp_path / "history")).query("signals")["ticker"]) == set(rep["signals"])
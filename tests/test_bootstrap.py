@@ -0,0 +1,38 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from src.bootstrap import bootstrap_distribution, bootstrap_indices, bootstrap_intervals
+
+@pytest.fixture(scope="module")
+def returns():
+    return pd.Series(np.random.default_rng(0).normal(0.0004, 0.01, 1260))
+
+@pytest.mark.parametrize("max_mb", [4, 16])
+def test_peak_memory_stays_under_max_mb(returns, max_mb):
+    tracemalloc.start()
+    try:
+        bootstrap_distribution(returns, n_paths=3000, seed=1, max_mb=max_mb)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= max_mb * 1e6 * 1.05
+
+def test_result_does_not_depend_on_chunking(returns):
+    a = bootstrap_distribution(returns, n_paths=500, seed=3, max_mb=1)
+    b = bootstrap_distribution(returns, n_paths=500, seed=3, max_mb=1024)
+    for m in a:
+        np.testing.assert_array_equal(a[m], b[m])
+
+@pytest.mark.parametrize("method", ["stationary", "block"])
+def test_indices_are_contiguous_blocks(method):
+    idx = bootstrap_indices(100, 50, block=10, method=method, rng=np.random.default_rng(0))
+    assert idx.shape == (50, 100) and idx.min() >= 0 and idx.max() < 100
+    steps = (np.diff(idx, axis=1) % 100) == 1
+    assert steps.mean() > 0.8
+
+def test_intervals_bracket_the_estimate(returns):
+    ci = bootstrap_intervals(returns, n_paths=1000, seed=0)
+    assert list(ci.index) == ["cagr", "sharpe", "max_drawdown", "hit_ratio"]
+    assert (ci["p5"] <= ci["p50"]).all() and (ci["p50"] <= ci["p95"]).all()
+    assert ci.loc["sharpe", "p5"] < ci.loc["sharpe", "estimate"] < ci.loc["sharpe", "p95"]
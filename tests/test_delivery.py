@@ -0,0 +1,221 @@
+import argparse, json, socketserver, threading, time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src import cli
+from src.delivery import Dispatcher, Ledger, Message, SlackSender, SmtpSender, chunk_markdown, retry_after_seconds
+
+def report(rows: int, stamp: str = "2024-06-28 18:00") -> str:
+    lines = [f"# Dagrapport • {stamp}", "", "## Signalen", "| Ticker | Advies | Close |", "|---|---|---:|"]
+    lines += [f"| T{i:04d}.AS | {'BUY' if i % 3 else 'HOLD'} | {100 + i:.2f} |" for i in range(rows)]
+    return "\n".join(lines + ["", "Einde."])
+
+class SlackStub:
+    def __init__(self, failures: int = 0, status: int = 503, retry_after: str = None):
+        self.failures = failures
+        self.status = status
+        self.retry_after = retry_after
+        self.texts = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                if stub.failures > 0:
+                    stub.failures -= 1
+                    self.send_response(stub.status)
+                    if stub.retry_after:
+                        self.send_header("Retry-After", stub.retry_after)
+                    self.end_headers()
+                    return
+                stub.texts.append(body["text"])
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class SmtpStub:
+    # minimale SMTP-server op een gewone socket: genoeg voor smtplib zonder STARTTLS
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub.connections += 1
+                self.wfile.write(b"220 stub\r\n")
+                rcpt, data = [], None
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    if data is not None:
+                        if line == b".\r\n":
+                            stub.messages.append((rcpt, b"".join(data).decode("utf-8")))
+                            rcpt, data = [], None
+                            self.wfile.write(b"250 ok\r\n")
+                        else:
+                            data.append(line)
+                        continue
+                    cmd = line.decode("ascii", "replace").strip().upper()
+                    if cmd.startswith("EHLO"):
+                        self.wfile.write(b"250-stub\r\n250 8BITMIME\r\n")
+                    elif cmd.startswith("RCPT"):
+                        rcpt.append(line.decode().split(":", 1)[1].strip(" <>\r\n"))
+                        self.wfile.write(b"250 ok\r\n")
+                    elif cmd == "DATA":
+                        data = []
+                        self.wfile.write(b"354 go\r\n")
+                    elif cmd == "QUIT":
+                        self.wfile.write(b"221 bye\r\n")
+                        return
+                    else:
+                        self.wfile.write(b"250 ok\r\n")
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def slack():
+    stub = SlackStub()
+    yield stub
+    stub.close()
+
+@pytest.fixture
+def smtp():
+    stub = SmtpStub()
+    yield stub
+    stub.close()
+
+def table_rows(chunk: str):
+    return [l for l in chunk.split("\n") if l.startswith("| T0")]
+
+def test_chunking_keeps_every_row_and_repeats_header():
+    md = report(400)
+    chunks = chunk_markdown(md, limit=1000)
+    assert len(chunks) > 5
+    assert all(len(c) <= 1000 for c in chunks)
+    assert [r for c in chunks for r in table_rows(c)] == table_rows(md)
+    for i, c in enumerate(chunks, 1):
+        assert c.endswith(f"_(deel {i}/{len(chunks)})_")
+        if table_rows(c):
+            head = c.split("\n")
+            at = head.index("| Ticker | Advies | Close |")
+            assert head[at + 1] == "|---|---|---:|" and table_rows(c)[0] == head[at + 2]
+    assert chunks[-1].split("\n")[-2] == "Einde."
+
+def test_short_report_is_not_chunked():
+    assert chunk_markdown(report(3)) == [report(3)]
+
+def test_slack_retries_on_503(slack):
+    slack.failures = 2
+    with Dispatcher({"slack": SlackSender(timeout=5)}, backoff=0.01) as d:
+        res = d.deliver([Message("slack", slack.url, "hallo")])[0]
+    assert res["status"] == "sent" and res["attempts"] == 3
+    assert slack.texts == ["hallo"]
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("2") == 2.0
+    assert retry_after_seconds("3600", cap=30) == 30
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=20), usegmt=True)
+    assert 15 < retry_after_seconds(later) <= 20
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert retry_after_seconds("morgen") is None and retry_after_seconds(None) is None
+
+def test_slack_honours_http_date_retry_after_within_cap(slack):
+    slack.failures, slack.status = 1, 429
+    slack.retry_after = format_datetime(datetime.now(timezone.utc) + timedelta(hours=1), usegmt=True)
+    t0 = time.monotonic()
+    with Dispatcher({"slack": SlackSender(timeout=5, max_retry_after=0.2)}, backoff=0.01) as d:
+        res = d.deliver([Message("slack", slack.url, "hallo")])[0]
+    assert res["status"] == "sent" and res["attempts"] == 2
+    assert 0.2 <= time.monotonic() - t0 < 2
+
+def test_slack_client_error_is_not_retried(slack):
+    slack.failures, slack.status = 5, 400
+    with Dispatcher({"slack": SlackSender(timeout=5)}, backoff=0.01) as d:
+        res = d.deliver([Message("slack", slack.url, "hallo")])[0]
+    assert res["status"] == "failed" and res["attempts"] == 1 and "400" in res["error"]
+    assert slack.requests == 1
+
+def test_chunks_arrive_in_order(slack):
+    md = report(300)
+    with Dispatcher({"slack": SlackSender(timeout=5, limit=1500)}, backoff=0.01) as d:
+        res = d.deliver([Message("slack", slack.url, md)])[0]
+    assert res["parts"] == len(slack.texts) > 1
+    assert slack.texts == chunk_markdown(md, 1500)
+
+def test_ledger_skips_duplicates(slack, tmp_path):
+    msg = Message("slack", slack.url, report(300), key="rapport-2024-06-28")
+    for _ in range(2):
+        with Dispatcher({"slack": SlackSender(timeout=5, limit=1500)}, Ledger(str(tmp_path / "ledger.json"))) as d:
+            res = d.deliver([msg])[0]
+    assert res["status"] == "duplicate"
+    assert len(slack.texts) == res["parts"]
+
+def test_rerun_with_a_new_timestamp_sends_nothing(slack, tmp_path):
+    # de kop van deel 1 bevat de tijd van de run; een herhaling op dezelfde dag mag geen los deel 1 sturen
+    ledger = str(tmp_path / "ledger.json")
+    for stamp in ("2024-06-28 18:00", "2024-06-28 18:07"):
+        with Dispatcher({"slack": SlackSender(timeout=5, limit=1500)}, Ledger(ledger)) as d:
+            res = d.deliver([Message("slack", slack.url, report(300, stamp), key="rapport-2024-06-28")])[0]
+    assert res["status"] == "duplicate"
+    assert len(slack.texts) == res["parts"]
+    for stamp in ("2024-06-28 18:00", "2024-06-28 18:07"):
+        with Dispatcher({"slack": SlackSender(timeout=5)}, Ledger(ledger)) as d:
+            res = d.deliver([Message("slack", slack.url, f"kort {stamp}", key="kort-2024-06-28")])[0]
+    assert res["status"] == "duplicate" and slack.texts[-1] == "kort 2024-06-28 18:00"
+
+def test_ledger_resends_a_report_chunked_differently(slack, tmp_path):
+    ledger = str(tmp_path / "ledger.json")
+    with Dispatcher({"slack": SlackSender(timeout=5, limit=1500)}, Ledger(ledger)) as d:
+        n = d.deliver([Message("slack", slack.url, report(300), key="rapport")])[0]["parts"]
+    # zelfde sleutel, ander aantal delen: geen enkel deel mag als 'al verzonden' gelden
+    with Dispatcher({"slack": SlackSender(timeout=5, limit=1200)}, Ledger(ledger)) as d:
+        res = d.deliver([Message("slack", slack.url, report(300), key="rapport")])[0]
+    assert res["status"] == "sent" and res["parts"] != n
+    assert slack.texts[n:] == chunk_markdown(report(300), 1200)
+
+def test_smtp_uses_one_connection_for_all_recipients(smtp, tmp_path):
+    sender = SmtpSender("127.0.0.1", smtp.port, sender="agent@example.com", starttls=False, timeout=5)
+    msgs = [Message("email", f"{n}@example.com", "Rapport\n| a | b |", subject="Dagrapport") for n in ("a", "b", "c")]
+    with Dispatcher({"email": sender}, Ledger(str(tmp_path / "ledger.json"))) as d:
+        res = d.deliver(msgs)
+        again = d.deliver(msgs)
+    assert [r["status"] for r in res] == ["sent"] * 3
+    assert [r["status"] for r in again] == ["duplicate"] * 3
+    assert smtp.connections == 1
+    assert sorted(r for rcpt, _ in smtp.messages for r in rcpt) == ["a@example.com", "b@example.com", "c@example.com"]
+    assert all("Subject: Dagrapport" in body for _, body in smtp.messages)
+
+def test_unknown_channel_fails_without_raising():
+    with Dispatcher({}) as d:
+        res = d.deliver([Message("fax", "123", "x")])[0]
+    assert res["status"] == "failed" and "fax" in res["error"]
+
+def test_missing_env_is_reported(monkeypatch, capsys):
+    monkeypatch.delenv("SLACK_WEBHOOK_URL", raising=False)
+    monkeypatch.delenv("EMAIL_TO", raising=False)
+    args = argparse.Namespace(to_slack="ENV", to_email="ENV", resend=False, ledger="off")
+    cli._deliver(args, [("", "Dagrapport", report(3), "2024-06-28")])
+    out = capsys.readouterr().out
+    assert "Slack: FOUT: SLACK_WEBHOOK_URL ontbreekt" in out and "E-mail: FOUT: EMAIL_TO ontbreekt" in out
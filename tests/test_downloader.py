@@ -0,0 +1,136 @@
+import time
+import pandas as pd
+import pytest
+from src.downloader import DownloadEngine, DownloadReport, RateLimiter
+from src.price_cache import PriceCache
+from src.providers import StaticProvider
+from src.synthetic import synthetic_universe
+
+START = pd.Timestamp("2020-01-01")
+
+@pytest.fixture(scope="module")
+def frames():
+    return synthetic_universe(6, years=1, seed=1, end=pd.Timestamp("2024-06-28"))
+
+class FlakyProvider(StaticProvider):
+    name = "flaky"
+
+    def __init__(self, frames, failures: int):
+        super().__init__(frames)
+        self.failures = failures
+
+    def fetch_many(self, tickers, start, end=None, timeout=None):
+        if self.failures > 0:
+            self.failures -= 1
+            self.calls.append((list(tickers), pd.Timestamp(start), end))
+            raise ConnectionError("tijdelijke fout")
+        return super().fetch_many(tickers, start, end, timeout)
+
+class LimitedProvider(StaticProvider):
+    name = "limited-test"
+    rate_limit = 20.0
+
+class HangingProvider(StaticProvider):
+    name = "hanging"
+
+    def fetch_many(self, tickers, start, end=None, timeout=None):
+        time.sleep(2.0)  # negeert de timeout, zoals yfinance soms doet
+        return super().fetch_many(tickers, start, end)
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+    t0 = time.perf_counter()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.perf_counter() - t0 >= 5 / 50 * 0.9
+
+def test_engine_respects_provider_rate_limit(frames):
+    engine = DownloadEngine(LimitedProvider(frames), batch_size=1, max_workers=6, retries=0)
+    t0 = time.perf_counter()
+    got, report = engine.download({t: START for t in frames})
+    assert set(got) == set(frames)
+    assert report.requests == len(frames)
+    # burst 1 en 20/s: zes requests kunnen niet sneller dan ~0,25s
+    assert time.perf_counter() - t0 >= (len(frames) - 1) / 20 * 0.9
+
+def test_batches_group_by_start_date(frames):
+    provider = StaticProvider(frames, batch_size=4)
+    tickers = list(frames)
+    starts = {t: START if i < 5 else pd.Timestamp("2024-01-02") for i, t in enumerate(tickers)}
+    got, report = DownloadEngine(provider).download(starts)
+    assert set(got) == set(frames)
+    assert sorted(len(c[0]) for c in provider.calls) == [1, 1, 4]
+    assert report.batches == 3
+
+def test_retry_with_backoff_recovers(frames):
+    provider = FlakyProvider(frames, failures=2)
+    engine = DownloadEngine(provider, max_workers=1, retries=3, backoff=0.05)
+    t0 = time.perf_counter()
+    got, report = engine.download({t: START for t in frames})
+    assert set(got) == set(frames) and not report.failures
+    assert len(provider.calls) == 3
+    assert all(n == 3 for n in report.attempts.values())
+    assert time.perf_counter() - t0 >= 0.05 + 0.1
+
+def test_retries_exhausted_reports_failures(frames):
+    provider = FlakyProvider(frames, failures=10)
+    got, report = DownloadEngine(provider, max_workers=1, retries=2, backoff=0.01).download({t: START for t in frames})
+    assert got == {}
+    assert set(report.failures) == set(frames)
+    assert "ConnectionError" in next(iter(report.failures.values()))
+    assert len(provider.calls) == 3
+
+def test_failed_ticker_is_retried_alone(frames):
+    bad = list(frames)[0]
+    provider = StaticProvider(frames, fail_tickers=(bad,))
+    got, report = DownloadEngine(provider, retries=2, backoff=0.01).download({t: START for t in frames})
+    assert bad not in got and len(got) == len(frames) - 1
+    assert report.attempts[bad] == 3 and report.attempts[list(frames)[1]] == 1
+    assert [c[0] for c in provider.calls[1:]] == [[bad], [bad]]
+
+def test_engine_enforces_timeout(frames):
+    engine = DownloadEngine(HangingProvider(frames), retries=0, timeout=0.2)
+    t0 = time.perf_counter()
+    got, report = engine.download({t: START for t in frames})
+    assert time.perf_counter() - t0 < 1.5
+    assert got == {}
+    assert all("TimeoutError" in e for e in report.failures.values())
+
+def test_stale_cache_is_returned_when_download_fails(frames):
+    provider = StaticProvider(frames, seed=0)
+    cache = PriceCache(None, provider, max_age_hours=0, engine=DownloadEngine(provider, retries=1, backoff=0.01))
+    first = cache.get(list(frames), START)
+    assert set(first) == set(frames)
+    provider.fail_rate = 1.0
+    second = cache.get(list(frames), START)
+    assert set(second) == set(frames)
+    for t in frames:
+        pd.testing.assert_frame_equal(second[t], first[t])
+    assert isinstance(cache.last_report, DownloadReport) and set(cache.last_report.failures) == set(frames)
+
+def yahoo_frame(frames, nan_tickers=()):
+    cols = {}
+    for t, df in frames.items():
+        for c in ["Open", "High", "Low", "Close", "Volume"]:
+            cols[(t, c)] = df[c] * float("nan") if t in nan_tickers else df[c]
+    return pd.DataFrame(cols)
+
+def test_yahoo_reports_empty_columns_per_ticker(frames, monkeypatch):
+    yf = pytest.importorskip("yfinance")
+    from src.providers import YahooProvider
+    names = list(frames)[:3]
+    monkeypatch.setattr(yf, "download", lambda tickers, **kw: yahoo_frame({t: frames[t] for t in tickers if t in frames}, names[1:2]))
+    # een fout van een andere batch in de globale lijst mag deze batch niet raken
+    shared = pytest.importorskip("yfinance.shared")
+    monkeypatch.setattr(shared, "_ERRORS", {names[0]: "fout uit een andere thread"}, raising=False)
+    got, errors = YahooProvider().fetch_many(names + ["ONBEKEND"], START)
+    assert sorted(got) == sorted([names[0], names[2]])
+    assert set(errors) == {names[1], "ONBEKEND"}
+    pd.testing.assert_frame_equal(got[names[0]], frames[names[0]], check_freq=False, check_names=False)
+
+def test_yahoo_empty_batch_is_transient(monkeypatch):
+    yf = pytest.importorskip("yfinance")
+    from src.providers import YahooProvider
+    monkeypatch.setattr(yf, "download", lambda tickers, **kw: pd.DataFrame())
+    with pytest.raises(RuntimeError, match="lege respons"):
+        YahooProvider().fetch_many(["AAPL"], START)
@@ -0,0 +1,39 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from src.forecasting import simple_forecast, trend_coefficients, walk_forward
+from src.synthetic import synthetic_universe
+
+@pytest.fixture(scope="module")
+def prices():
+    return synthetic_universe(4, years=1, seed=5, end=pd.Timestamp("2024-06-28"))
+
+def test_trend_coefficients_match_polyfit():
+    rng = np.random.default_rng(0)
+    Y = rng.normal(0, 0.01, (120, 3))
+    Y[:40, 1] = np.nan
+    a, b = trend_coefficients(Y, np.array([120, 80, 120]))
+    for j in range(3):
+        y = Y[~np.isnan(Y[:, j]), j]
+        slope, icpt = np.polyfit(np.arange(len(y)), y, 1)
+        assert np.isclose(b[j], slope) and np.isclose(a[j], icpt)
+
+def test_walk_forward_rejects_window_below_two(prices):
+    with pytest.raises(ValueError):
+        walk_forward(prices, window=1)
+
+def test_walk_forward_small_window_has_no_warnings(prices):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        res = walk_forward(prices, horizon_days=5, window=2)
+    assert np.isfinite(res["forecasts"]["pred_logret"]).all()
+
+def test_walk_forward_last_expanding_fit_matches_simple_forecast(prices):
+    t, df = next(iter(prices.items()))
+    close = df["Close"].dropna()
+    fc = walk_forward({t: df.iloc[:-5]}, horizon_days=5)["forecasts"]
+    # de laatste cutoff gebruikt dezelfde data als simple_forecast op de afgekapte reeks
+    expected = simple_forecast({t: df.iloc[:-10]}, horizon_days=5)[t]
+    assert np.isclose(fc["pred_price"].iloc[-1], expected)
+    assert fc["date"].iloc[-1] == close.index[-11]
@@ -0,0 +1,86 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.history import HistoryStore
+
+TICKERS = ["AAPL", "ASML.AS", "MSFT", "NVDA"]
+
+def rep(day: str, flip=(), close: float = 100.0) -> dict:
+    signals = {t: {"signal": "SELL" if t in flip else "BUY", "close": close + i, "sma_s": 1.0, "sma_l": 2.0,
+                   "rsi": 50.0, "macd": 0.1, "macd_sig": 0.0} for i, t in enumerate(TICKERS)}
+    return {"timestamp": f"{day} 18:00", "signals": signals, "forecast_5d": {t: 101.0 for t in TICKERS},
+            "opportunities": {"Tech": [("NVDA", 1.5), ("AAPL", 0.5)]},
+            "sector_report": [{"sector": "Tech", "tickers": "AAPL, NVDA", "avg_price": 100.0, "count": 2}]}
+
+def ts(day: str, hour: int = 18) -> datetime:
+    return datetime.fromisoformat(f"{day} {hour:02d}:00:00")
+
+@pytest.fixture
+def store(tmp_path):
+    h = HistoryStore(str(tmp_path))
+    days = pd.bdate_range("2024-05-20", "2024-05-31").strftime("%Y-%m-%d")
+    for i, day in enumerate(days):
+        h.append(rep(day, flip=("NVDA",) if i % 4 == 3 else (), close=100 + i), day, ts(day))
+    # tweede run op dezelfde dag, later en met een ander signaal
+    h.append(rep(days[-1], flip=("AAPL",), close=200), days[-1], ts(days[-1], 20))
+    return h
+
+def parts(h, table="signals"):
+    return sorted(p.name for p in (h.root / table).rglob("*.parquet"))
+
+def test_latest_run_of_a_day_wins(store):
+    df = store.query("signals", "2024-05-31", "2024-05-31")
+    assert len(df) == len(TICKERS)
+    assert df.set_index("ticker").loc["AAPL", "signal"] == "SELL"
+    assert (df["run_ts"] == ts("2024-05-31", 20)).all()
+    assert len(store.query("signals", "2024-05-31", "2024-05-31", latest=False)) == 2 * len(TICKERS)
+
+def test_filters_on_time_range_and_tickers(store):
+    df = store.query("signals", "2024-05-22", "2024-05-24", tickers=["NVDA", "MSFT"], columns=["close"])
+    assert set(df["ticker"]) == {"NVDA", "MSFT"}
+    assert df["date"].min() == pd.Timestamp("2024-05-22") and df["date"].max() == pd.Timestamp("2024-05-24")
+    assert len(store.query("signals", tickers=["NVDA"])) == 10
+    assert store.query("signals", "2023-01-01", "2023-12-31").empty
+
+def test_flips(store):
+    flips = store.flips(["NVDA", "AAPL"])
+    nvda = flips[flips["ticker"] == "NVDA"]
+    assert list(nvda["date"].dt.strftime("%Y-%m-%d")) == ["2024-05-23", "2024-05-24", "2024-05-29", "2024-05-30"]
+    assert list(nvda["previous"]) == ["BUY", "SELL", "BUY", "SELL"]
+    aapl = flips[flips["ticker"] == "AAPL"]
+    assert len(aapl) == 1 and aapl.iloc[0]["signal"] == "SELL"
+
+def test_compaction_keeps_query_results(store):
+    before = {t: store.query(t) for t in ("signals", "forecasts", "screener", "sectors")}
+    flips = store.flips()
+    done = store.compact()
+    assert done["signals"] == 11
+    assert parts(store) == ["data.parquet"]
+    for t, df in before.items():
+        pd.testing.assert_frame_equal(store.query(t), df)
+    pd.testing.assert_frame_equal(store.flips(), flips)
+    # de latere run van de dag is bewaard, de eerdere verwijderd
+    assert len(store.query("signals", "2024-05-31", "2024-05-31", latest=False)) == len(TICKERS)
+
+def test_compaction_can_keep_intraday_runs(store):
+    store.compact(keep_intraday=True)
+    assert len(store.query("signals", "2024-05-31", "2024-05-31", latest=False)) == 2 * len(TICKERS)
+    assert store.query("signals", "2024-05-31", "2024-05-31").set_index("ticker").loc["AAPL", "signal"] == "SELL"
+    # opnieuw compacteren met een bestaand data.parquet en nieuwe delen
+    store.append(rep("2024-05-31", close=300), "2024-05-31", ts("2024-05-31", 21))
+    store.compact()
+    assert (store.query("signals", "2024-05-31", "2024-05-31", latest=False)["close"] >= 300).all()
+
+def test_new_month_compacts_the_previous_one(store):
+    assert len(parts(store)) == 11
+    store.append(rep("2024-06-03"), "2024-06-03", ts("2024-06-03"))
+    assert len(parts(store)) == 2 and "data.parquet" in parts(store)
+    assert len(list((store.root / "signals" / "month=2024-05").glob("*.parquet"))) == 1
+    assert len(store.query("signals", "2024-05-01", "2024-05-31")) == 10 * len(TICKERS)
+
+def test_previous_skips_runs_of_the_same_day(store):
+    prev = store.previous("signals", "2024-05-31")
+    assert (prev["date"] == pd.Timestamp("2024-05-30")).all()
+    # vandaag staat AAPL al op SELL (latere run), maar vergeleken wordt met gisteren
+    assert store.diff(rep("2024-05-31", flip=("AAPL",))["signals"], "2024-05-31") == [
+        {"ticker": "AAPL", "from": "BUY", "to": "SELL", "close": 100.0, "since": "2024-05-30"}]
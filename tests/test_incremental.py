@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import MACD, SMAIndicator
+from src.incremental import EMA, TOLERANCE, LiveSignals, MACDState, RollingSMA, WilderRSI
+from src.signals import generate_signals, indicators, signal_labels, signal_series
+from src.synthetic import synthetic_universe
+
+PARAMS = {"ma_short": 10, "ma_long": 30, "rsi_period": 14, "rsi_buy": 40, "rsi_sell": 60}
+
+@pytest.fixture(scope="module")
+def prices():
+    return synthetic_universe(4, years=3, seed=9, end=pd.Timestamp("2024-06-28"))
+
+def feed(state, closes):
+    return np.array([state.update(x) for x in closes], dtype=float)
+
+def assert_close(got, ref, tol):
+    ref = ref.to_numpy(dtype=float)
+    assert (np.isnan(got) == np.isnan(ref)).all()
+    on = ~np.isnan(ref)
+    assert np.all(np.abs(got[on] - ref[on]) <= tol[on] if np.ndim(tol) else np.abs(got[on] - ref[on]) <= tol)
+
+def test_bar_by_bar_matches_ta(prices):
+    for df in prices.values():
+        close = df["Close"]
+        x = close.to_numpy(dtype=float)
+        scale = TOLERANCE * np.abs(x)
+        for w in (10, 50):
+            assert_close(feed(RollingSMA(w), x), SMAIndicator(close, window=w).sma_indicator(), scale)
+        assert_close(feed(WilderRSI(14), x), RSIIndicator(close, window=14).rsi(), TOLERANCE)
+        macd = MACD(close)
+        out = feed(MACDState(), x)
+        assert_close(out[:, 0], macd.macd(), scale)
+        assert_close(out[:, 1], macd.macd_signal(), scale)
+        assert_close(feed(EMA.from_span(20), x), close.ewm(span=20, min_periods=20, adjust=False).mean(), scale)
+
+def test_peek_does_not_change_state(prices):
+    x = next(iter(prices.values()))["Close"].to_numpy(dtype=float)
+    a, b = WilderRSI(14), WilderRSI(14)
+    for v in x[:100]:
+        a.update(v); b.update(v)
+    assert a.peek(x[100]) == b.update(x[100]) and a.value != b.value
+
+def batch_flips(df):
+    ind = indicators(df, PARAMS["ma_short"], PARAMS["ma_long"], PARAMS["rsi_period"])
+    labels = pd.Series(signal_labels(signal_series(ind, PARAMS["rsi_buy"], PARAMS["rsi_sell"]).to_numpy()), index=ind.index)
+    prev = labels.shift()
+    return [(ts, p, s) for ts, p, s in zip(labels.index, prev, labels) if isinstance(p, str) and p != s]
+
+def test_live_flips_match_generate_signals(prices):
+    live = LiveSignals(PARAMS)
+    for t, df in prices.items():
+        for ts, x in df["Close"].items():
+            live.update_bar(t, ts, x)
+        assert [(c["time"], c["from"], c["to"]) for c in live.changes if c["ticker"] == t] == batch_flips(df)
+    batch = generate_signals(prices, PARAMS)
+    snap = live.snapshot()
+    for t in prices:
+        assert snap[t]["signal"] == batch[t]["signal"]
+        assert abs(snap[t]["rsi"] - batch[t]["rsi"]) <= TOLERANCE
+
+def test_update_frame_continues_where_it_stopped(prices):
+    t, df = next(iter(prices.items()))
+    live = LiveSignals(PARAMS)
+    for end in range(200, len(df) + 1, 37):
+        live.update_frame(t, df.iloc[:end])
+    live.update_frame(t, df)
+    assert live.snapshot()[t] == generate_signals({t: df}, PARAMS, live=LiveSignals(PARAMS))[t]
+
+def test_reseeds_after_adjusted_history(prices):
+    t, df = next(iter(prices.items()))
+    live = LiveSignals(PARAMS)
+    live.update_frame(t, df.iloc[:-5])
+    # split 2:1 opnieuw opgehaald: de hele historie is gehalveerd
+    adjusted = df.assign(Close=df["Close"] / 2)
+    live.update_frame(t, adjusted)
+    fresh = LiveSignals(PARAMS)
+    fresh.update_frame(t, adjusted)
+    assert live.snapshot()[t] == fresh.snapshot()[t]
+    # alleen de eerste bar aangepast telt ook
+    changed = adjusted.copy()
+    changed.iloc[0, changed.columns.get_loc("Close")] *= 1.01
+    live.update_frame(t, changed)
+    fresh = LiveSignals(PARAMS)
+    fresh.update_frame(t, changed)
+    assert live.snapshot()[t] == fresh.snapshot()[t]
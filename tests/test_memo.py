@@ -0,0 +1,39 @@
+import threading, time
+import pandas as pd
+from src.memo import LRUCache, bar_dates, make_key
+
+def frame(last: str) -> pd.DataFrame:
+    idx = pd.bdate_range(end=last, periods=5)
+    return pd.DataFrame({"Close": range(5)}, index=idx)
+
+def test_bar_dates_change_only_with_a_new_bar():
+    before = {"ASML.AS": frame("2024-12-24"), "AAPL": frame("2024-12-24")}
+    same = {"AAPL": frame("2024-12-24"), "ASML.AS": frame("2024-12-24")}
+    after = {"ASML.AS": frame("2024-12-24"), "AAPL": frame("2024-12-26")}
+    assert make_key("x", bar_dates(before)) == make_key("x", bar_dates(same))
+    assert make_key("x", bar_dates(before)) != make_key("x", bar_dates(after))
+    assert bar_dates({"LEEG": frame("2024-12-24").iloc[:0]}) == {}
+
+def test_lru_eviction_and_ttl():
+    cache = LRUCache(max_entries=2, max_bytes=None)
+    cache.put("a", 1); cache.put("b", 2); cache.get("a"); cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.evictions == 1
+    cache.put("t", 1, ttl=0.05)
+    time.sleep(0.06)
+    assert cache.get("t") is None
+
+def test_get_or_compute_coalesces_concurrent_calls():
+    cache = LRUCache()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get_or_compute("k", slow))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert out == [42] * 6 and len(calls) == 1 and cache.coalesced == 5
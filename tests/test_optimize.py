@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from src import optimize as optimize_mod
+from src.optimize import PARAM_KEYS, optimize, param_grid
+from src.synthetic import synthetic_universe
+
+GRID = {"ma_short": [10, 20], "ma_long": [50], "rsi_period": [14], "rsi_buy": [30, 35], "rsi_sell": [70], "cost_bps": [0, 5]}
+
+@pytest.fixture(scope="module")
+def prices():
+    return synthetic_universe(5, years=2, seed=3, end=pd.Timestamp("2024-06-28"))
+
+def test_resume_from_truncated_checkpoint(prices, tmp_path):
+    ck = tmp_path / "ck.csv"
+    full = optimize(prices, GRID, workers=1, checkpoint=str(ck))
+    lines = ck.read_text(encoding="utf-8").splitlines(keepends=True)
+    # drie volledige rijen en een half geschreven regel
+    ck.write_text("".join(lines[:4]) + lines[4][:6], encoding="utf-8")
+    resumed = optimize(prices, GRID, workers=1, checkpoint=str(ck))
+    pd.testing.assert_frame_equal(resumed, full)
+    text = ck.read_text(encoding="utf-8")
+    # de bestaande rijen blijven staan; alleen de ontbrekende worden achter de afgekapte regel toegevoegd
+    assert text.startswith("".join(lines[:4])) and text.count("\n") == len(full) + 1
+    assert len(pd.read_csv(ck)) == len(full)
+
+def test_checkpoint_appends_each_group_once(prices, tmp_path, monkeypatch):
+    written = []
+    append = optimize_mod._append_checkpoint
+    monkeypatch.setattr(optimize_mod, "_append_checkpoint", lambda path, rows: (written.append(len(rows)), append(path, rows)))
+    ck = tmp_path / "ck.csv"
+    optimize(prices, GRID, workers=1, checkpoint=str(ck))
+    # per (ma_short, ma_long, rsi_period)-groep één append met alleen de eigen rijen: lineair schrijfwerk
+    assert written == [4, 4] and sum(written) == len(param_grid(GRID))
+    assert ck.read_text(encoding="utf-8").count("ma_short") == 1
+
+def test_parallel_matches_serial(prices):
+    serial = optimize(prices, GRID, workers=1)
+    parallel = optimize(prices, GRID, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert list(serial.columns[1:len(PARAM_KEYS) + 1]) == PARAM_KEYS
@@ -0,0 +1,74 @@
+import subprocess, sys, textwrap
+from multiprocessing import shared_memory
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from src.panel import PricePanel
+from src.synthetic import synthetic_universe
+
+@pytest.fixture(scope="module")
+def prices():
+    prices = synthetic_universe(4, years=1, seed=5, end=pd.Timestamp("2024-06-28"))
+    # één ticker met een gat en een kortere historie
+    t = list(prices)[1]
+    prices[t] = prices[t].iloc[30:].drop(prices[t].index[60:65])
+    return prices
+
+def test_round_trip(prices):
+    panel = PricePanel.from_dict(prices)
+    for t, df in panel.to_dict().items():
+        pd.testing.assert_frame_equal(df, prices[t][list(panel.fields)], check_freq=False)
+
+def test_views_do_not_copy(prices):
+    panel = PricePanel.from_dict(prices)
+    t = panel.tickers[0]
+    assert np.shares_memory(panel.view(t).to_numpy(), panel.values)
+    assert np.shares_memory(panel.field("Close"), panel.values)
+
+def test_save_loads_as_memmap(prices, tmp_path):
+    panel = PricePanel.from_dict(prices).save(str(tmp_path / "panel"))
+    assert isinstance(panel.values, np.memmap)
+    assert PricePanel.attach(panel.handle()).to_dict().keys() == prices.keys()
+
+def test_shared_attach_sees_the_same_memory(prices):
+    shared = PricePanel.from_dict(prices).to_shared()
+    name = shared._shm.name
+    try:
+        other = PricePanel.attach(shared.handle())
+        other.values[3, 0, -1] = -1.0
+        assert shared.values[3, 0, -1] == -1.0
+        assert other.to_dict().keys() == prices.keys()
+        other.close()
+    finally:
+        shared.unlink()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+def test_parallel_optimize_leaves_resource_tracker_clean(tmp_path):
+    # workers koppelen aan het gedeelde panel; de resource tracker mag daarna niets lekken of klagen
+    conftest = Path(__file__).with_name("conftest.py")
+    script = textwrap.dedent(f"""
+        import runpy
+        runpy.run_path({str(conftest)!r})
+        import pandas as pd
+        from src.optimize import optimize
+        from src.synthetic import synthetic_universe
+        prices = synthetic_universe(4, years=1, seed=5, end=pd.Timestamp("2024-06-28"))
+        grid = {{"ma_short": [10, 20], "ma_long": [50], "rsi_period": [14], "rsi_buy": [30], "rsi_sell": [70], "cost_bps": [5]}}
+        assert optimize(prices, grid, workers=3).equals(optimize(prices, grid, workers=1))
+    """)
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120, cwd=tmp_path)
+    assert out.returncode == 0, out.stderr
+    assert "KeyError" not in out.stderr and "leaked" not in out.stderr, out.stderr
+
+def test_shared_indicator_panel_matches_private(prices):
+    from src.optimize import indicator_panel
+    private = indicator_panel(prices, [10, 50], [14])
+    shared = indicator_panel(prices, [10, 50], [14], shared=True)
+    try:
+        assert shared._shm is not None
+        np.testing.assert_array_equal(shared.values, private.values)
+        np.testing.assert_array_equal(shared.valid, private.valid)
+    finally:
+        shared.unlink()
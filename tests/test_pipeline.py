@@ -0,0 +1,41 @@
+import math, tracemalloc
+import pytest
+from src.pipeline import Stage, run_stages
+
+def boom():
+    raise RuntimeError("kapot")
+
+def test_stages_run_in_dependency_order_and_failures_propagate():
+    stages = [
+        Stage("a", lambda: 1),
+        Stage("b", lambda a: a + 1, deps=["a"]),
+        Stage("bad", boom, default="leeg"),
+        Stage("c", lambda b, bad: b, deps=["b", "bad"], default=0),
+    ]
+    res, timings, errors = run_stages(stages)
+    assert res["b"] == 2 and res["bad"] == "leeg" and res["c"] == 0
+    assert errors["bad"] == "RuntimeError: kapot"
+    assert timings["c"]["status"] == "skipped" and "bad" in errors["c"]
+
+def test_optional_inputs_do_not_skip_the_stage():
+    stages = [
+        Stage("a", lambda: 1),
+        Stage("bad", boom, default="leeg"),
+        Stage("c", lambda a, bad: (a, bad), deps=["a"], optional=["bad"]),
+    ]
+    res, timings, errors = run_stages(stages)
+    assert res["c"] == (1, "leeg") and "c" not in errors and timings["c"]["status"] == "ok"
+
+def test_memory_tracing_is_off_by_default():
+    _, timings, _ = run_stages([Stage("a", lambda: [0] * 1000)])
+    assert math.isnan(timings["a"]["peak_mem_mb"])
+    assert not tracemalloc.is_tracing()
+
+def test_memory_tracing_on_request():
+    _, timings, _ = run_stages([Stage("a", lambda: bytearray(2_000_000))], trace_memory=True)
+    assert timings["a"]["peak_mem_mb"] >= 1.9
+    assert not tracemalloc.is_tracing()
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", lambda b: b, deps=["b"]), Stage("b", lambda a: a, deps=["a"])])
@@ -0,0 +1,110 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.price_cache import PriceCache
+from src.providers import StaticProvider
+from src.synthetic import synthetic_universe
+
+START = pd.Timestamp("2023-01-02")
+
+def universe():
+    return synthetic_universe(3, years=2, seed=4, end=pd.Timestamp("2024-06-28"))
+
+def test_concurrent_gets_fetch_once_and_keep_one_index(tmp_path):
+    prices = universe()
+    provider = StaticProvider(prices, latency=0.2)
+    cache = PriceCache(str(tmp_path), provider)
+    other = cache.with_max_age(1)
+    tickers = list(prices)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: (cache if i % 2 else other).get(tickers, START), range(8)))
+    assert len(provider.calls) == 1
+    assert all(r.keys() == results[0].keys() == prices.keys() for r in results)
+    assert not list(tmp_path.glob("*.tmp"))
+    # beide caches schrijven dezelfde index: een nieuwe cache op deze map hoeft niets op te halen
+    again = PriceCache(str(tmp_path), provider)
+    assert again.get(tickers, START).keys() == prices.keys() and len(provider.calls) == 1
+
+def test_frames_stay_in_memory(tmp_path, monkeypatch):
+    prices = universe()
+    cache = PriceCache(str(tmp_path), StaticProvider(prices))
+    cache.get(list(prices), START)
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("opnieuw van schijf gelezen")
+    monkeypatch.setattr(pd, "read_parquet", no_disk)
+    assert cache.get(list(prices), START).keys() == prices.keys()
+
+def test_stale_entry_is_refreshed_incrementally(tmp_path):
+    prices = universe()
+    provider = StaticProvider({t: df.loc[:"2024-05-31"] for t, df in prices.items()})
+    cache = PriceCache(str(tmp_path), provider, max_age_hours=0)
+    first = cache.get(list(prices), START)
+    last = max(df.index[-1] for df in first.values())
+    provider.frames = StaticProvider(prices).frames
+    fresh = cache.get(list(prices), START)
+    # alleen vanaf de laatste bekende bar min de overlap ophalen, niet de volledige historie
+    assert cache.stats["full_fetches"] == 3 and cache.stats["delta_fetches"] == 3
+    assert {c[1] for c in provider.calls[1:]} == {last - cache.overlap}
+    for t, df in prices.items():
+        pd.testing.assert_frame_equal(fresh[t], df.loc[START:], check_freq=False)
+
+def test_corrupt_or_truncated_parquet_is_refetched(tmp_path):
+    prices = universe()
+    tickers = list(prices)
+    PriceCache(str(tmp_path), StaticProvider(prices)).get(tickers, START)
+    broken, cut = tmp_path / f"{tickers[0]}.parquet", tmp_path / f"{tickers[1]}.parquet"
+    broken.write_bytes(b"geen parquet")
+    cut.write_bytes(cut.read_bytes()[:200])
+    provider = StaticProvider(prices)
+    cache = PriceCache(str(tmp_path), provider)
+    result = cache.get(tickers, START)
+    assert cache.stats["recovered"] == 2 and cache.stats["full_fetches"] == 2 and cache.stats["disk_hits"] == 1
+    assert sorted(provider.calls[0][0]) == sorted(tickers[:2]) and provider.calls[0][1] == START
+    for t, df in prices.items():
+        pd.testing.assert_frame_equal(result[t], df.loc[START:], check_freq=False)
+    # de herschreven bestanden zijn weer leesbaar: een nieuwe cache hoeft niets op te halen
+    assert PriceCache(str(tmp_path), provider).get(tickers, START).keys() == prices.keys() and len(provider.calls) == 1
+
+def test_corrupt_index_is_rebuilt(tmp_path):
+    prices = universe()
+    tickers = list(prices)
+    PriceCache(str(tmp_path), StaticProvider(prices)).get(tickers, START)
+    (tmp_path / "index.json").write_text('{"AAPL": {"covered_', encoding="utf-8")
+    cache = PriceCache(str(tmp_path), StaticProvider(prices))
+    result = cache.get(tickers, START)
+    assert result.keys() == prices.keys()
+    index = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+    assert set(index) == set(tickers)
+    # zonder index zijn de frames niet meer als vers bekend: bijwerken met een delta, niet alles opnieuw
+    assert cache.stats["recovered"] == 0 and cache.stats["full_fetches"] == 0 and cache.stats["delta_fetches"] == 3
+
+def test_earlier_start_refetches_and_moves_coverage(tmp_path):
+    prices = universe()
+    tickers = list(prices)
+    provider = StaticProvider(prices)
+    cache = PriceCache(str(tmp_path), provider)
+    cache.get(tickers, START)
+    earlier = pd.Timestamp("2022-09-01")
+    result = cache.get(tickers, earlier)
+    assert cache.stats["full_fetches"] == 6 and provider.calls[-1][1] == earlier
+    assert all(cache._index[t]["covered_from"] == "2022-09-01" for t in tickers)
+    for t, df in prices.items():
+        pd.testing.assert_frame_equal(result[t], df.loc[earlier:], check_freq=False)
+    # daarna is de eerdere start gedekt: geen nieuwe download, ook niet voor de oorspronkelijke start
+    cache.get(tickers, earlier)
+    cache.get(tickers, START)
+    assert len(provider.calls) == 2
+
+def test_concurrent_gets_recover_a_corrupt_file_once(tmp_path):
+    prices = universe()
+    tickers = list(prices)
+    PriceCache(str(tmp_path), StaticProvider(prices)).get(tickers, START)
+    (tmp_path / f"{tickers[0]}.parquet").write_bytes(b"kapot")
+    provider = StaticProvider(prices, latency=0.1)
+    cache = PriceCache(str(tmp_path), provider)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.get(tickers, START), range(8)))
+    assert cache.stats["recovered"] == 1 and len(provider.calls) == 1
+    assert all(r.keys() == prices.keys() for r in results)
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,63 @@
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+import pytest
+import yaml
+from src import service as service_mod
+from src.client import ServiceClient
+from src.price_cache import get_default_cache, set_default_cache
+from src.service import AgentService, make_handler
+from src.synthetic import use_synthetic_prices
+
+CFG = {
+    "portfolio": {"tickers": ["ASML.AS", "AAPL", "MSFT"], "weights": None},
+    "sectors": {"Tech": ["ASML.AS", "AAPL", "MSFT"]},
+    "risk": {"max_position_pct": 0.2, "stop_loss_pct": 0.1, "take_profit_pct": 0.2},
+    "signals": {"ma_short": 20, "ma_long": 50, "rsi_period": 14, "rsi_buy": 35, "rsi_sell": 65},
+    "data": {"lookback_days": 365},
+}
+
+@pytest.fixture
+def service(tmp_path):
+    use_synthetic_prices(years=3, seed=3)
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(CFG), encoding="utf-8")
+    yield AgentService(str(path), refresh_minutes=1)
+    set_default_cache(None)
+
+def test_service_uses_its_own_price_cache(service):
+    default = get_default_cache()
+    assert service.prices is not default
+    rep, _ = service.route("GET", ["report"], {})
+    assert set(rep["signals"]) == set(CFG["portfolio"]["tickers"])
+    service.route("GET", ["backtest"], {"ticker": "AAPL"})
+    service.route("GET", ["backtest", "portfolio"], {})
+    # alles loopt via de cache van de service; de standaardcache van het proces is niet vervangen of gebruikt
+    assert get_default_cache() is default
+    assert service.prices.stats["full_fetches"] == 3 and default.stats["full_fetches"] == 0
+
+def test_concurrent_identical_requests_compute_once(service, monkeypatch):
+    calls = []
+
+    def slow_run_day(*args, **kwargs):
+        calls.append(threading.get_ident())
+        time.sleep(0.3)
+        return {"timestamp": "2024-06-28 18:00", "signals": {"AAPL": {"signal": "BUY"}}}
+    monkeypatch.setattr(service_mod, "run_day", slow_run_day)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        client = ServiceClient(f"http://127.0.0.1:{httpd.server_address[1]}", timeout=10)
+        with ThreadPoolExecutor(8) as pool:
+            answers = list(pool.map(lambda _: client.signals("AAPL"), range(8)))
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert answers == [{"signal": "BUY"}] * 8
+    assert len(calls) == 1
+    assert service.cache.stats()["coalesced"] + service.cache.stats()["hits"] == 7
+
+def test_client_reports_unreachable_service():
+    with pytest.raises(RuntimeError, match="niet bereikbaar"):
+        ServiceClient("http://127.0.0.1:9", timeout=2).health()
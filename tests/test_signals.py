@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.backtest import _backtest_codes, backtest_portfolio, backtest_ticker
+from src.signals import generate_signals, indicators, signal_codes, signal_from_row, signal_labels, signal_matrix, signal_series
+from src.synthetic import synthetic_universe
+
+PARAMS = {"ma_short": 10, "ma_long": 30, "rsi_period": 14, "rsi_buy": 40, "rsi_sell": 60}
+
+@pytest.fixture(scope="module")
+def prices():
+    return synthetic_universe(8, years=3, seed=7, end=pd.Timestamp("2024-06-28"))
+
+@pytest.fixture(scope="module")
+def inds(prices):
+    return {t: indicators(df, PARAMS["ma_short"], PARAMS["ma_long"], PARAMS["rsi_period"]).dropna() for t, df in prices.items()}
+
+def reference_signals(ind: pd.DataFrame) -> pd.Series:
+    return ind.apply(lambda r: signal_from_row(r, PARAMS["rsi_buy"], PARAMS["rsi_sell"]), axis=1)
+
+def reference_backtest(df: pd.DataFrame, ind: pd.DataFrame, cost_bps: float = 5) -> pd.Series:
+    # de oorspronkelijke rij-voor-rij backtest
+    signals = reference_signals(ind)
+    pos = signals.map({"BUY": 1.0, "SELL": -1.0, "HOLD": 0.0}).shift(1).fillna(0.0)
+    ret = df["Close"].reindex(ind.index).pct_change().fillna(0.0)
+    trades = pos.diff().abs().fillna(0.0)
+    return pos * ret - trades * (cost_bps / 10000.0)
+
+def test_signal_codes_match_rowwise_rule(inds):
+    for ind in inds.values():
+        ref = reference_signals(ind)
+        codes = signal_series(ind, PARAMS["rsi_buy"], PARAMS["rsi_sell"])
+        assert codes.index.equals(ind.index)
+        assert (signal_labels(codes.to_numpy()) == ref.to_numpy()).all()
+
+def test_signal_codes_edge_cases():
+    # gelijke waarden geven HOLD, en SELL wint van BUY zoals in signal_from_row
+    row = {"SMA_S": 1.0, "SMA_L": 1.0, "RSI": 50.0, "MACD": 0.0, "MACD_SIG": 0.0}
+    assert signal_codes(*(np.array([row[c]]) for c in ["SMA_S", "SMA_L", "RSI", "MACD", "MACD_SIG"]))[0] == 0.0
+    assert signal_from_row(pd.Series(row)) == "HOLD"
+
+def test_signal_matrix_matches_per_ticker(inds):
+    mat = signal_matrix(inds, PARAMS["rsi_buy"], PARAMS["rsi_sell"])
+    assert set(mat.columns) == set(inds)
+    for t, ind in inds.items():
+        col = mat[t].dropna()
+        assert col.index.equals(ind.index)
+        assert (signal_labels(col.to_numpy()) == reference_signals(ind).to_numpy()).all()
+
+def test_backtest_codes_bit_identical(prices, inds):
+    for t, ind in inds.items():
+        ref = reference_backtest(prices[t], ind)
+        res = _backtest_codes(prices[t], signal_series(ind, PARAMS["rsi_buy"], PARAMS["rsi_sell"]))
+        pd.testing.assert_series_equal(res["returns"], ref, check_names=False, rtol=0, atol=0)
+        pd.testing.assert_series_equal(backtest_ticker(prices[t], PARAMS)["returns"], ref, check_names=False, rtol=0, atol=0)
+
+def test_backtest_portfolio_matches_per_ticker_reference(prices, inds):
+    res = backtest_portfolio(prices, PARAMS)
+    ref = pd.concat([reference_backtest(prices[t], inds[t]).rename(t) for t in prices], axis=1, sort=True).fillna(0.0)
+    w = pd.Series({t: 1 / len(prices) for t in prices})
+    pd.testing.assert_series_equal(res["returns"], (ref * w).sum(axis=1), check_names=False, rtol=0, atol=0)
+
+def test_generate_signals_uses_last_row(prices, inds):
+    out = generate_signals(prices, PARAMS)
+    for t, ind in inds.items():
+        assert out[t]["signal"] == signal_from_row(ind.iloc[-1], PARAMS["rsi_buy"], PARAMS["rsi_sell"])
+        assert out[t]["close"] == float(ind["Close"].iloc[-1])
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import simulation
+from src.backtest import backtest_portfolio
+from src.simulation import simulate_portfolio
+from src.synthetic import synthetic_universe
+
+PARAMS = {"ma_short": 10, "ma_long": 30, "rsi_period": 14, "rsi_buy": 40, "rsi_sell": 60}
+
+def run(monkeypatch, closes: dict, codes, dates=None, **kwargs):
+    # simulator zonder indicatoren: vaste koersen en signalen per ticker
+    tickers = list(closes)
+    C = np.column_stack([np.asarray(closes[t], dtype=float) for t in tickers])
+    dates = pd.DatetimeIndex(dates if dates is not None else pd.bdate_range("2024-03-04", periods=len(C)))
+    codes = np.broadcast_to(np.asarray(codes, dtype=float).reshape(len(C), -1), C.shape).copy()
+    monkeypatch.setattr(simulation, "_aligned", lambda prices, params: (dates, tickers, C, codes))
+    return simulate_portfolio({t: None for t in tickers}, PARAMS, **kwargs)
+
+def test_daily_rebalance_without_costs_matches_backtest_portfolio():
+    prices = synthetic_universe(6, years=3, seed=11, end=pd.Timestamp("2024-06-28"))
+    sim = simulate_portfolio(prices, PARAMS, rebalance="D", cost_bps=0)
+    ref = backtest_portfolio(prices, PARAMS, cost_bps=0)
+    ref = ref["returns"].reindex(sim["returns"].index).fillna(0.0)
+    assert np.abs(sim["returns"].to_numpy() - ref.to_numpy()).max() < 1e-12
+
+def test_stop_loss_exits_at_the_close_and_stays_flat(monkeypatch):
+    res = run(monkeypatch, {"A": [100, 95, 89, 92, 120, 125]}, [1] * 6, weights={"A": 1.0},
+              risk={"stop_loss_pct": 0.1}, rebalance=None, cost_bps=0)
+    np.testing.assert_allclose(res["returns"].to_numpy(), [0, -0.05, 89 / 95 - 1, 0, 0, 0], atol=1e-15)
+    assert res["metrics"]["stop_losses"] == 1 and res["metrics"]["take_profits"] == 0
+    assert (res["weights"]["A"].iloc[3:] == 0).all()
+
+def test_take_profit_on_a_short(monkeypatch):
+    res = run(monkeypatch, {"A": [100, 90, 78, 70, 60]}, [-1] * 5, weights={"A": 1.0},
+              risk={"take_profit_pct": 0.2}, rebalance=None, cost_bps=0)
+    # short vanaf 100: op 78 is de winst 22% en wordt gesloten
+    np.testing.assert_allclose(res["returns"].to_numpy(), [0, 0.1, 0.12 / 1.1, 0, 0], atol=1e-15)
+    assert res["metrics"]["take_profits"] == 1 and res["metrics"]["stop_losses"] == 0
+
+def test_position_cap(monkeypatch):
+    closes = {"A": 100 * 1.1 ** np.arange(5), "B": 100 * 0.95 ** np.arange(5)}
+    res = run(monkeypatch, closes, [1] * 5, weights={"A": 0.6, "B": 0.4}, risk={"max_position_pct": 0.5},
+              rebalance="D", cost_bps=0)
+    # A begrensd op 50%, de rest blijft cash
+    np.testing.assert_allclose(res["returns"].to_numpy()[1:], 0.5 * 0.1 + 0.4 * -0.05, atol=1e-15)
+    # gewichten op de slot, na de koersbeweging van die dag en vóór de rebalance
+    np.testing.assert_allclose(res["weights"].iloc[1].to_numpy(), np.array([0.55, 0.38]) / 1.03, atol=1e-15)
+
+def test_rebalance_cost_by_hand(monkeypatch):
+    # 50/50 long, A stijgt 10% in januari, rebalance op de slot van 31 januari, 10 bps
+    dates = ["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02"]
+    res = run(monkeypatch, {"A": [100, 110, 110, 110], "B": [100, 100, 100, 100]}, [1] * 4, dates=dates,
+              weights={"A": 0.5, "B": 0.5}, rebalance="M", cost_bps=10)
+    # instap: 1.0 verhandeld -> 0.999; januari: +0.05 -> 1.049; rebalance 0.55/0.50 -> 0.5245/0.5245 verhandelt 0.05
+    assert res["equity"].iloc[0] == pytest.approx(0.999, abs=1e-15)
+    assert res["equity"].iloc[-1] == pytest.approx(1.049 - 0.001 * 0.05, abs=1e-15)
+    assert res["turnover"].iloc[1] == pytest.approx(0.05 / 1.049, abs=1e-15)
+    # na de rebalance weer gelijk gewogen; de kosten gaan van de cash af
+    np.testing.assert_allclose(res["weights"].iloc[2].to_numpy(), 0.5 / (1 - 0.001 * 0.05 / 1.049), atol=1e-15)
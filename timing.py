@@ -0,0 +1,25 @@
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+class Timings:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.phases: List[Tuple[str, float]] = []
+        self.t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - t))
+
+    def total(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def report(self) -> str:
+        lines = [f"{name:<24} {sec*1000:9.1f} ms" for name, sec in self.phases]
+        lines.append(f"{'totaal':<24} {self.total()*1000:9.1f} ms")
+        return "\n".join(lines)